@@ -0,0 +1,71 @@
+"""Compare two bench.run reports scenario by scenario.
+
+    python -m bench.compare bench/results/before.json bench/results/after.json
+
+Latency deltas are negative when the second report is faster, throughput
+deltas are positive when it handles more requests per second. Rows whose
+change exceeds --threshold percent are flagged.
+"""
+import argparse
+import json
+import sys
+
+METRICS = (("p50_ms", -1), ("p95_ms", -1), ("p99_ms", -1), ("throughput_rps", 1))
+
+
+def load(path: str) -> tuple[dict, dict]:
+    with open(path) as f:
+        report = json.load(f)
+    return report, {(row["scenario"], row["concurrency"]): row for row in report["results"]}
+
+
+def change(before, after) -> float | None:
+    if before in (None, 0) or after is None:
+        return None
+    return (after - before) / before * 100
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("before")
+    parser.add_argument("after")
+    parser.add_argument("--threshold", type=float, default=10, help="flag changes larger than this percentage")
+    args = parser.parse_args()
+
+    before_report, before = load(args.before)
+    after_report, after = load(args.after)
+    print(f"before: {before_report['label']} ({before_report.get('git_revision')})")
+    print(f"after:  {after_report['label']} ({after_report.get('git_revision')})")
+    print()
+
+    header = f"{'scenario':<12} {'c':>4} " + " ".join(f"{name:>24}" for name, _ in METRICS) + f" {'errors':>11}"
+    print(header)
+    print("-" * len(header))
+    regressions = 0
+    for key in sorted(set(before) | set(after)):
+        old, new = before.get(key), after.get(key)
+        if not old or not new:
+            print(f"{key[0]:<12} {key[1]:>4} only in {'after' if new else 'before'}")
+            continue
+        cells, flagged = [], False
+        for name, better in METRICS:
+            delta = change(old[name], new[name])
+            if delta is None:
+                cells.append(f"{str(old[name]):>10} -> {str(new[name]):<10}  ")
+                continue
+            if abs(delta) >= args.threshold:
+                flagged = True
+                if delta * better < 0:
+                    regressions += 1
+            cells.append(f"{old[name]:>8} -> {new[name]:<8} {delta:+5.0f}%")
+        errors = f"{old['errors']} -> {new['errors']}"
+        print(f"{key[0]:<12} {key[1]:>4} " + " ".join(f"{cell:>24}" for cell in cells)
+              + f" {errors:>11}" + (" *" if flagged else ""))
+
+    print()
+    print(f"{regressions} metric(s) regressed by more than {args.threshold:g}%")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
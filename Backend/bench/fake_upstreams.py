@@ -0,0 +1,90 @@
+"""Local stand-ins for the Hugging Face FLUX endpoint and the Twitter clone.
+
+    python -m bench.fake_upstreams --port 9100 --hf-latency-ms 1500 --hf-error-rate 0.02
+
+Point the API at it with HUGGINGFACE_URL=http://127.0.0.1:9100/hf and
+TWITTER_CLONE_URL=http://127.0.0.1:9100/twitter. Latency is applied with
+asyncio.sleep so a single process can hold many slow requests open.
+"""
+import argparse
+import asyncio
+import io
+import random
+
+import uvicorn
+from fastapi import FastAPI, Request, Response
+from PIL import Image
+
+
+def render_image(size: int) -> bytes:
+    # FLUX answers with JPEG bytes; a gradient keeps the encoder doing real work
+    image = Image.linear_gradient("L").resize((size, size)).convert("RGB")
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=90)
+    return buffer.getvalue()
+
+
+def create_app(hf_latency_ms: float = 0, hf_error_rate: float = 0, image_size: int = 1024,
+               twitter_latency_ms: float = 0, twitter_error_rate: float = 0) -> FastAPI:
+    app = FastAPI()
+    image_bytes = render_image(image_size)
+    stats = {"hf": 0, "twitter": 0}
+    settings = {"hf_latency_ms": hf_latency_ms, "hf_error_rate": hf_error_rate,
+                "twitter_latency_ms": twitter_latency_ms, "twitter_error_rate": twitter_error_rate}
+
+    async def delay(latency_ms: float):
+        if latency_ms > 0:
+            # +/-20% jitter so requests don't complete in lockstep
+            await asyncio.sleep(latency_ms * random.uniform(0.8, 1.2) / 1000)
+
+    @app.post("/hf")
+    async def huggingface(request: Request):
+        await request.body()
+        stats["hf"] += 1
+        await delay(settings["hf_latency_ms"])
+        if random.random() < settings["hf_error_rate"]:
+            return Response(status_code=503, content=b'{"error":"Model is currently loading"}',
+                            media_type="application/json")
+        return Response(content=image_bytes, media_type="image/jpeg")
+
+    @app.post("/twitter")
+    async def twitter(request: Request):
+        if not request.headers.get("api-key"):
+            return Response(status_code=401, content=b'{"error":"missing api-key"}', media_type="application/json")
+        body = await request.json()
+        stats["twitter"] += 1
+        await delay(settings["twitter_latency_ms"])
+        if random.random() < settings["twitter_error_rate"]:
+            return Response(status_code=503, content=b'{"error":"unavailable"}', media_type="application/json")
+        return {"id": stats["twitter"], "username": body.get("username"), "text": body.get("text")}
+
+    @app.get("/stats")
+    async def get_stats():
+        return stats
+
+    @app.put("/settings")
+    async def update_settings(values: dict):
+        # lets the runner seed data quickly, then switch on realistic latency
+        settings.update({key: float(value) for key, value in values.items() if key in settings})
+        return settings
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--hf-latency-ms", type=float, default=0)
+    parser.add_argument("--hf-error-rate", type=float, default=0)
+    parser.add_argument("--image-size", type=int, default=1024)
+    parser.add_argument("--twitter-latency-ms", type=float, default=0)
+    parser.add_argument("--twitter-error-rate", type=float, default=0)
+    args = parser.parse_args()
+    app = create_app(args.hf_latency_ms, args.hf_error_rate, args.image_size,
+                     args.twitter_latency_ms, args.twitter_error_rate)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Measure cold-start import time of the API (`import src.main`).
+
+    cd Backend
+    python -m bench.import_time                    # working tree
+    python -m bench.import_time --ref HEAD~1       # working tree vs. an older commit
+
+Each run is a fresh interpreter so nothing is cached in sys.modules. The
+report gives the median wall time and, from `python -X importtime`, the
+packages that spend the most time importing. With --ref the older tree is
+exported with `git archive` into a temporary directory and measured the
+same way.
+"""
+import argparse
+import io
+import os
+import statistics
+import subprocess
+import sys
+import tarfile
+import tempfile
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+# no database is contacted on import, an in-memory SQLite URL keeps engine creation local
+IMPORT_ENV = {"DB_URL": "sqlite://", "LLM_WARMUP": "false", "GIMINI_API_KEY": "import-time"}
+
+
+def run_once(backend_dir: Path) -> tuple[float, dict[str, int]]:
+    env = dict(os.environ, PYTHONPATH=str(backend_dir), **IMPORT_ENV)
+    started = time.perf_counter()
+    completed = subprocess.run([sys.executable, "-X", "importtime", "-c", "import src.main"],
+                               cwd=backend_dir, env=env, capture_output=True, text=True)
+    elapsed = time.perf_counter() - started
+    if completed.returncode != 0:
+        raise RuntimeError(f"import src.main failed in {backend_dir}:\n{completed.stderr[-2000:]}")
+
+    # "import time: self [us] | cumulative | imported package"; self time summed per top-level package
+    packages = {}
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        own, _, name = line[len("import time:"):].split("|")
+        package = name.strip().split(".")[0]
+        packages[package] = packages.get(package, 0) + int(own)
+    return elapsed, packages
+
+
+def measure(backend_dir: Path, runs: int) -> dict:
+    timings, packages = [], {}
+    for _ in range(runs):
+        elapsed, own_times = run_once(backend_dir)
+        timings.append(elapsed)
+        for name, micros in own_times.items():
+            packages.setdefault(name, []).append(micros)
+    slowest = sorted(((statistics.median(values) / 1000, name) for name, values in packages.items()), reverse=True)
+    return {
+        "median_s": statistics.median(timings),
+        "min_s": min(timings),
+        "max_s": max(timings),
+        "top_packages_ms": [(name, round(ms, 1)) for ms, name in slowest[:10]],
+    }
+
+
+def export_ref(ref: str, destination: Path) -> Path:
+    repo_root = Path(subprocess.run(["git", "rev-parse", "--show-toplevel"], cwd=BACKEND_DIR,
+                                    capture_output=True, text=True, check=True).stdout.strip())
+    prefix = BACKEND_DIR.relative_to(repo_root).as_posix()
+    archive = subprocess.run(["git", "archive", "--format=tar", ref, prefix], cwd=repo_root,
+                             capture_output=True, check=True).stdout
+    with tarfile.open(fileobj=io.BytesIO(archive)) as tar:
+        tar.extractall(destination)
+    return destination / prefix
+
+
+def report(label: str, result: dict):
+    print(f"{label}: median {result['median_s'] * 1000:.0f}ms "
+          f"(min {result['min_s'] * 1000:.0f}ms, max {result['max_s'] * 1000:.0f}ms)")
+    for name, ms in result["top_packages_ms"]:
+        print(f"    {ms:>9.1f}ms  {name}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--ref", default=None, help="git revision to compare against")
+    args = parser.parse_args()
+
+    current = measure(BACKEND_DIR, args.runs)
+    if args.ref:
+        with tempfile.TemporaryDirectory(prefix="import-time-") as workdir:
+            baseline = measure(export_ref(args.ref, Path(workdir)), args.runs)
+        report(args.ref, baseline)
+        print()
+    report("working tree", current)
+    if args.ref:
+        change = (current["median_s"] - baseline["median_s"]) / baseline["median_s"] * 100
+        print(f"\nmedian change: {change:+.0f}%")
+
+
+if __name__ == "__main__":
+    main()
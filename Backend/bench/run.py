@@ -0,0 +1,306 @@
+"""Offline load test for the tweet API.
+
+Starts the fake upstreams (bench.fake_upstreams) and the API with the stub LLM,
+seeds a database, then drives each scenario at every concurrency level and
+writes a JSON report with p50/p95/p99 latency and throughput:
+
+    cd Backend
+    python -m bench.run --label before --out bench/results/before.json
+    git checkout my-branch
+    python -m bench.run --label after --out bench/results/after.json
+    python -m bench.compare bench/results/before.json bench/results/after.json
+
+Scenarios: generate (POST /tweet/generate-tweet with unique topics),
+list, list_search and list_deep (GET /tweet/tweets at offset 0, with a search
+term, and near the end of the table), image (GET /tweet/image/{id}) and post
+(POST /tweet/post-tweet/{id} on distinct unposted tweets).
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+SCENARIOS = ("generate", "list", "list_search", "list_deep", "image", "post")
+WORDS = ("python", "coffee", "rust", "space", "football", "music", "climate", "startup",
+         "design", "history", "travel", "cinema", "security", "gardening", "chess", "robots")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def percentile(sorted_values: list[float], pct: float) -> float | None:
+    # nearest-rank, so p99 of 100 samples is the 99th value rather than an interpolation
+    if not sorted_values:
+        return None
+    rank = max(1, -(-len(sorted_values) * pct // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def summarize(scenario: str, concurrency: int, samples: list[tuple[float, int]], elapsed: float) -> dict:
+    latencies = sorted(latency for latency, _ in samples)
+    statuses = {}
+    for _, status in samples:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    errors = sum(1 for _, status in samples if status == 0 or status >= 400)
+    return {
+        "scenario": scenario,
+        "concurrency": concurrency,
+        "requests": len(samples),
+        "errors": errors,
+        "error_rate": round(errors / len(samples), 4) if samples else 0,
+        "statuses": statuses,
+        "p50_ms": round(percentile(latencies, 50), 2) if latencies else None,
+        "p95_ms": round(percentile(latencies, 95), 2) if latencies else None,
+        "p99_ms": round(percentile(latencies, 99), 2) if latencies else None,
+        "mean_ms": round(sum(latencies) / len(latencies), 2) if latencies else None,
+        "max_ms": round(latencies[-1], 2) if latencies else None,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(samples) / elapsed, 2) if elapsed > 0 else None,
+    }
+
+
+async def drive(client: httpx.AsyncClient, build_request, total: int, concurrency: int):
+    """Send `total` requests with `concurrency` workers; returns (samples, elapsed seconds).
+
+    A sample is (latency_ms, status), with status 0 for transport errors.
+    """
+    samples = []
+    counter = iter(range(total))
+
+    async def worker():
+        for index in counter:
+            method, url, kwargs = build_request(index)
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, url, **kwargs)
+                await response.aread()
+                status = response.status_code
+            except httpx.HTTPError:
+                status = 0
+            samples.append(((time.perf_counter() - started) * 1000, status))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return samples, time.perf_counter() - started
+
+
+class Workload:
+    """Seeded ids and the request builders for each scenario."""
+
+    def __init__(self, tweet_ids: list[int], image_ids: list[int], seed: int):
+        self.tweet_ids = tweet_ids
+        self.image_ids = image_ids
+        self.unposted = list(tweet_ids)
+        self.random = random.Random(seed)
+        self.topic_counter = 0
+
+    def builder(self, scenario: str):
+        return getattr(self, f"_{scenario}")
+
+    def _generate(self, index):
+        self.topic_counter += 1
+        topic = f"{self.random.choice(WORDS)} news {time.time_ns()} {self.topic_counter}"
+        return "POST", "/tweet/generate-tweet", {"json": {"topic": topic}}
+
+    def _list(self, index):
+        return "GET", "/tweet/tweets", {"params": {"limit": 10}}
+
+    def _list_search(self, index):
+        return "GET", "/tweet/tweets", {"params": {"limit": 10, "search": self.random.choice(WORDS)}}
+
+    def _list_deep(self, index):
+        total = len(self.tweet_ids)
+        offset = self.random.randint(int(total * 0.8), max(int(total * 0.8), total - 10))
+        return "GET", "/tweet/tweets", {"params": {"limit": 10, "offset": offset}}
+
+    def _image(self, index):
+        tweet_id = self.image_ids[index % len(self.image_ids)]
+        return "GET", f"/tweet/image/{tweet_id}", {}
+
+    def _post(self, index):
+        # each tweet can only be posted once, later requests measure the "already posted" path
+        tweet_id = self.unposted.pop() if self.unposted else self.tweet_ids[index % len(self.tweet_ids)]
+        return "POST", f"/tweet/post-tweet/{tweet_id}", {}
+
+
+async def wait_ready(url: str, process: subprocess.Popen, timeout: float):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise RuntimeError(f"Process for {url} exited with code {process.returncode}")
+            try:
+                await client.get(url, timeout=2)
+                return
+            except httpx.HTTPError:
+                await asyncio.sleep(0.2)
+    raise RuntimeError(f"Timed out waiting for {url}")
+
+
+async def seed(client: httpx.AsyncClient, total: int, batch_size: int) -> Workload:
+    tweet_ids, image_ids = [], []
+    rng = random.Random(total)
+    for start in range(0, total, batch_size):
+        topics = [f"{rng.choice(WORDS)} and {rng.choice(WORDS)} seed {index}"
+                  for index in range(start, min(total, start + batch_size))]
+        response = await client.post("/tweet/generate-batch", json={"topics": topics, "max_concurrency": 64})
+        response.raise_for_status()
+        for item in response.json()["results"]:
+            tweet_ids.append(item["id"])
+            if item["image"]:
+                image_ids.append(item["id"])
+    print(f"seeded {len(tweet_ids)} tweets ({len(image_ids)} with images)", file=sys.stderr)
+    return Workload(tweet_ids, image_ids, seed=total)
+
+
+async def run(args, api_url: str, upstream_url: str) -> list[dict]:
+    timeout = httpx.Timeout(args.timeout)
+    limits = httpx.Limits(max_connections=max(args.concurrency) + 10)
+    async with httpx.AsyncClient(base_url=api_url, timeout=timeout, limits=limits) as client:
+        await client.put(f"{upstream_url}/settings", json={"hf_latency_ms": 0, "twitter_latency_ms": 0,
+                                                            "hf_error_rate": 0, "twitter_error_rate": 0})
+        workload = await seed(client, args.seed, args.seed_batch)
+        await client.put(f"{upstream_url}/settings", json={
+            "hf_latency_ms": args.hf_latency_ms, "hf_error_rate": args.hf_error_rate,
+            "twitter_latency_ms": args.twitter_latency_ms, "twitter_error_rate": args.twitter_error_rate,
+        })
+
+        results = []
+        for scenario in args.scenarios:
+            if scenario == "image" and not workload.image_ids:
+                print("skipping image scenario, no seeded tweet has an image", file=sys.stderr)
+                continue
+            for concurrency in args.concurrency:
+                build_request = workload.builder(scenario)
+                if args.warmup:
+                    await drive(client, build_request, min(args.warmup, args.requests), concurrency)
+                samples, elapsed = await drive(client, build_request, args.requests, concurrency)
+                summary = summarize(scenario, concurrency, samples, elapsed)
+                results.append(summary)
+                print(f"{scenario:<12} c={concurrency:<4} p50={summary['p50_ms']}ms p95={summary['p95_ms']}ms "
+                      f"p99={summary['p99_ms']}ms rps={summary['throughput_rps']} errors={summary['errors']}",
+                      file=sys.stderr)
+        return results
+
+
+def start_processes(args, workdir: Path):
+    upstream_port, api_port = free_port(), free_port()
+    upstream_url = f"http://127.0.0.1:{upstream_port}"
+    upstreams = subprocess.Popen(
+        [sys.executable, "-m", "bench.fake_upstreams", "--port", str(upstream_port),
+         "--image-size", str(args.image_size)],
+        cwd=BACKEND_DIR,
+    )
+
+    env = dict(os.environ)
+    env.update({
+        "PYTHONPATH": str(BACKEND_DIR),
+        "DB_URL": args.db_url or f"sqlite:///{workdir / 'bench.db'}",
+        "LLM_PROVIDER": "stub",
+        "GIMINI_API_KEY": "bench",
+        "STUB_LLM_LATENCY_MS": str(args.llm_latency_ms),
+        "STUB_LLM_ERROR_RATE": str(args.llm_error_rate),
+        "STUB_LLM_IMAGE_RATIO": str(args.image_ratio),
+        "HUGGINGFACE_TOKEN": "bench",
+        "HUGGINGFACE_URL": f"{upstream_url}/hf",
+        "TWITTER_CLONE_URL": f"{upstream_url}/twitter",
+        "TWITTER_CLONE_API_KEY": "bench",
+        "BATCH_MAX_CONCURRENCY": "64",
+    })
+    # run from a scratch directory so generated images land in workdir/upload
+    api = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "src.main:app", "--host", "127.0.0.1", "--port", str(api_port),
+         "--workers", str(args.workers), "--log-level", "warning", "--no-access-log"],
+        cwd=workdir, env=env, stdout=None if args.verbose else subprocess.DEVNULL,
+    )
+    return upstreams, api, upstream_url, f"http://127.0.0.1:{api_port}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--label", default=None, help="name for this run, defaults to the git revision")
+    parser.add_argument("--out", default=None, help="report path, defaults to bench/results/<label>.json")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--concurrency", default="1,8,32", help="comma separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=200, help="requests per scenario and concurrency level")
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=1000, help="tweets generated before measuring")
+    parser.add_argument("--seed-batch", type=int, default=200)
+    parser.add_argument("--db-url", default=None, help="defaults to a fresh SQLite file")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--llm-latency-ms", type=float, default=300)
+    parser.add_argument("--llm-error-rate", type=float, default=0)
+    parser.add_argument("--image-ratio", type=float, default=0.5, help="share of topics the stub says need an image")
+    parser.add_argument("--hf-latency-ms", type=float, default=2000)
+    parser.add_argument("--hf-error-rate", type=float, default=0)
+    parser.add_argument("--image-size", type=int, default=1024)
+    parser.add_argument("--twitter-latency-ms", type=float, default=150)
+    parser.add_argument("--twitter-error-rate", type=float, default=0)
+    parser.add_argument("--startup-timeout", type=float, default=60)
+    parser.add_argument("--verbose", action="store_true", help="show the API's stdout")
+    args = parser.parse_args()
+
+    args.scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+    args.concurrency = [int(level) for level in args.concurrency.split(",")]
+    revision = git_revision()
+    label = args.label or revision or "run"
+    out = Path(args.out) if args.out else BACKEND_DIR / "bench" / "results" / f"{label}.json"
+
+    with tempfile.TemporaryDirectory(prefix="tweet-bench-") as workdir:
+        upstreams, api, upstream_url, api_url = start_processes(args, Path(workdir))
+        try:
+            asyncio.run(wait_ready(f"{upstream_url}/stats", upstreams, args.startup_timeout))
+            asyncio.run(wait_ready(f"{api_url}/docs", api, args.startup_timeout))
+            results = asyncio.run(run(args, api_url, upstream_url))
+        finally:
+            for process in (api, upstreams):
+                process.terminate()
+                try:
+                    process.wait(timeout=10)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+
+    config = {key: value for key, value in vars(args).items() if key not in ("label", "out")}
+    report = {
+        "label": label,
+        "git_revision": revision,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": config,
+        "results": results,
+    }
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, indent=2))
+    print(f"wrote {out}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,11 @@
 from src.services.twitter_service import TweetService
+from src.services.job_service import JobService
+from src.services.posting_service import PostingScheduler
+from src.services.transfer_service import TweetTransferService
 from src.routes.twitter_routes import TweetRouter
 
 tweet_service = TweetService()
-tweet_router = TweetRouter(tweet_service)
+job_service = JobService(tweet_service)
+posting_scheduler = PostingScheduler(tweet_service)
+transfer_service = TweetTransferService(tweet_service)
+tweet_router = TweetRouter(tweet_service, job_service, posting_scheduler, transfer_service)
@@ -7,4 +7,97 @@ TWITTER_API_KEY=os.getenv("TWITTER_CLONE_API_KEY")
 DB_URL=os.getenv("DB_URL")
 # DB_URL="fshfbshfbshfbs"
 FRONTEND_URL = os.getenv("FRONTEND_URL", "*")
-HUGGINGFACE_TOKEN=os.getenv("HUGGINGFACE_TOKEN")
\ No newline at end of file
+HUGGINGFACE_TOKEN=os.getenv("HUGGINGFACE_TOKEN")
+HUGGINGFACE_URL=os.getenv("HUGGINGFACE_URL", "https://api-inference.huggingface.co/models/black-forest-labs/FLUX.1-dev")
+
+# LLM backend: "gemini", or "stub" for offline benchmarks
+LLM_PROVIDER=os.getenv("LLM_PROVIDER", "gemini")
+STUB_LLM_LATENCY_MS=float(os.getenv("STUB_LLM_LATENCY_MS", "0"))
+STUB_LLM_ERROR_RATE=float(os.getenv("STUB_LLM_ERROR_RATE", "0"))
+STUB_LLM_IMAGE_RATIO=float(os.getenv("STUB_LLM_IMAGE_RATIO", "0.5"))
+# Build the LLM client in the background at startup instead of on the first request
+LLM_WARMUP=os.getenv("LLM_WARMUP", "true").lower() == "true"
+# "combined" asks for the tweet and the image decision in one structured call, "separate" makes two calls
+GENERATION_MODE=os.getenv("GENERATION_MODE", "combined")
+
+# Background generation jobs
+JOB_WORKERS=int(os.getenv("JOB_WORKERS", "4"))
+JOB_MAX_PENDING=int(os.getenv("JOB_MAX_PENDING", "200"))
+JOB_LLM_CONCURRENCY=int(os.getenv("JOB_LLM_CONCURRENCY", "4"))
+JOB_IMAGE_CONCURRENCY=int(os.getenv("JOB_IMAGE_CONCURRENCY", "2"))
+# a running job not updated for this long is taken to be abandoned by a dead process
+JOB_STALE_SECONDS=int(os.getenv("JOB_STALE_SECONDS", "900"))
+
+# Bulk generation
+BATCH_MAX_TOPICS=int(os.getenv("BATCH_MAX_TOPICS", "500"))
+BATCH_MAX_CONCURRENCY=int(os.getenv("BATCH_MAX_CONCURRENCY", "8"))
+BATCH_IMAGE_CONCURRENCY=int(os.getenv("BATCH_IMAGE_CONCURRENCY", "2"))
+
+# LLM response cache
+LLM_CACHE_ENABLED=os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+LLM_CACHE_MEMORY_SIZE=int(os.getenv("LLM_CACHE_MEMORY_SIZE", "1024"))
+LLM_CACHE_DB_MAX_ENTRIES=int(os.getenv("LLM_CACHE_DB_MAX_ENTRIES", "20000"))
+LLM_CACHE_TWEET_TTL_SECONDS=int(os.getenv("LLM_CACHE_TWEET_TTL_SECONDS", str(24 * 3600)))
+LLM_CACHE_DECISION_TTL_SECONDS=int(os.getenv("LLM_CACHE_DECISION_TTL_SECONDS", str(30 * 24 * 3600)))
+
+# Tweet listing
+COUNT_CACHE_TTL_SECONDS=int(os.getenv("COUNT_CACHE_TTL_SECONDS", "30"))
+
+# Near-duplicate detection: tweets sharing at least this share of their words (estimated Jaccard similarity)
+DUPLICATE_MIN_SIMILARITY=float(os.getenv("DUPLICATE_MIN_SIMILARITY", "0.6"))
+# extra text generations when a request asks to regenerate near-duplicates
+DUPLICATE_MAX_RETRIES=int(os.getenv("DUPLICATE_MAX_RETRIES", "2"))
+
+# Bulk export / import
+EXPORT_CHUNK_SIZE=int(os.getenv("EXPORT_CHUNK_SIZE", "1000"))
+IMPORT_CHUNK_SIZE=int(os.getenv("IMPORT_CHUNK_SIZE", "1000"))
+# uploads larger than this are spooled to a temporary file instead of memory
+IMPORT_SPOOL_MAX_BYTES=int(os.getenv("IMPORT_SPOOL_MAX_BYTES", str(8 * 1024 * 1024)))
+
+# Listing response cache; set RESPONSE_CACHE_URL=redis://... to share it between workers
+RESPONSE_CACHE_ENABLED=os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() == "true"
+RESPONSE_CACHE_SIZE=int(os.getenv("RESPONSE_CACHE_SIZE", "512"))
+RESPONSE_CACHE_TTL_SECONDS=int(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "300"))
+RESPONSE_CACHE_URL=os.getenv("RESPONSE_CACHE_URL")
+
+# Idempotency-Key replay window
+IDEMPOTENCY_TTL_SECONDS=int(os.getenv("IDEMPOTENCY_TTL_SECONDS", str(24 * 3600)))
+
+# Upstream HTTP clients
+HTTP_POOL_SIZE=int(os.getenv("HTTP_POOL_SIZE", "20"))
+HTTP_BACKOFF_BASE_SECONDS=float(os.getenv("HTTP_BACKOFF_BASE_SECONDS", "0.5"))
+HTTP_BACKOFF_MAX_SECONDS=float(os.getenv("HTTP_BACKOFF_MAX_SECONDS", "8"))
+CIRCUIT_FAILURE_THRESHOLD=int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+CIRCUIT_RESET_SECONDS=float(os.getenv("CIRCUIT_RESET_SECONDS", "30"))
+HF_CONNECT_TIMEOUT_SECONDS=float(os.getenv("HF_CONNECT_TIMEOUT_SECONDS", "5"))
+HF_READ_TIMEOUT_SECONDS=float(os.getenv("HF_READ_TIMEOUT_SECONDS", "120"))
+HF_MAX_RETRIES=int(os.getenv("HF_MAX_RETRIES", "3"))
+TWITTER_CONNECT_TIMEOUT_SECONDS=float(os.getenv("TWITTER_CONNECT_TIMEOUT_SECONDS", "5"))
+TWITTER_READ_TIMEOUT_SECONDS=float(os.getenv("TWITTER_READ_TIMEOUT_SECONDS", "15"))
+TWITTER_MAX_RETRIES=int(os.getenv("TWITTER_MAX_RETRIES", "2"))
+
+# Scheduled posting
+POST_RATE_PER_MINUTE=float(os.getenv("POST_RATE_PER_MINUTE", "30"))
+POST_BURST=int(os.getenv("POST_BURST", "5"))
+POST_POLL_SECONDS=float(os.getenv("POST_POLL_SECONDS", "5"))
+POST_DISPATCH_BATCH=int(os.getenv("POST_DISPATCH_BATCH", "20"))
+POST_MAX_ATTEMPTS=int(os.getenv("POST_MAX_ATTEMPTS", "5"))
+POST_RETRY_BASE_SECONDS=float(os.getenv("POST_RETRY_BASE_SECONDS", "30"))
+POST_RETRY_MAX_SECONDS=float(os.getenv("POST_RETRY_MAX_SECONDS", "1800"))
+
+# Image serving
+IMAGE_INDEX_SIZE=int(os.getenv("IMAGE_INDEX_SIZE", "4096"))
+IMAGE_MAX_AGE_SECONDS=int(os.getenv("IMAGE_MAX_AGE_SECONDS", str(365 * 24 * 3600)))
+IMAGE_WORKERS=int(os.getenv("IMAGE_WORKERS", "2"))
+IMAGE_WEBP_QUALITY=int(os.getenv("IMAGE_WEBP_QUALITY", "80"))
+IMAGE_THUMB_SIZE=int(os.getenv("IMAGE_THUMB_SIZE", "480"))
+
+# Database pool
+DB_POOL_SIZE=int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW=int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT=float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE=int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING=os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+
+# Metrics: log requests slower than this with their stage breakdown (0 disables)
+SLOW_REQUEST_MS=float(os.getenv("SLOW_REQUEST_MS", "0"))
\ No newline at end of file
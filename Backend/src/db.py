@@ -1,19 +1,93 @@
-import traceback
+from functools import lru_cache
+from sqlalchemy import inspect, text, Table
+from sqlalchemy.engine import make_url, URL
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine
 from sqlmodel import create_engine,Session,SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from src.config import  DB_URL
+from src.metrics import instrument_engine
+from src.config import  DB_URL, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE, DB_POOL_PRE_PING
+from src.schemas.schema import Tweet
+from src.services.search_index import search_index
+
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+def engine_options(url: URL) -> dict:
+        options = {"pool_pre_ping": DB_POOL_PRE_PING}
+        # SQLite pools are per-file/per-thread and take no sizing arguments.
+        if url.get_backend_name() != "sqlite":
+            options.update(
+                pool_size=DB_POOL_SIZE,
+                max_overflow=DB_MAX_OVERFLOW,
+                pool_timeout=DB_POOL_TIMEOUT,
+                pool_recycle=DB_POOL_RECYCLE,
+            )
+        return options
+
+def async_url(url: URL) -> URL:
+        backend = url.get_backend_name()
+        if backend not in ASYNC_DRIVERS:
+            raise ValueError(f"No async driver configured for database backend '{backend}'")
+        query = dict(url.query)
+        # asyncpg takes ssl=..., not libpq's sslmode=...
+        if backend == "postgresql" and "sslmode" in query:
+            query["ssl"] = query.pop("sslmode")
+        return url.set(drivername=ASYNC_DRIVERS[backend], query=query)
+
+engine= create_engine(DB_URL, **engine_options(make_url(DB_URL)))
+instrument_engine(engine)
+
+@lru_cache(maxsize=1)
+def get_async_engine() -> AsyncEngine:
+        url = make_url(DB_URL)
+        async_engine = create_async_engine(async_url(url), **engine_options(url))
+        instrument_engine(async_engine.sync_engine)
+        return async_engine
+
+def add_missing_columns(table: Table):
+        # create_all never alters existing tables; new nullable columns are added here.
+        inspector = inspect(engine)
+        if not inspector.has_table(table.name):
+            return
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        with engine.begin() as conn:
+            for column in table.columns:
+                if column.name not in existing:
+                    column_type = column.type.compile(dialect=engine.dialect)
+                    conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+                    print(f"Added column {table.name}.{column.name}")
 
-engine= create_engine(DB_URL)
 def create_table():
         SQLModel.metadata.create_all(bind=engine)
+        add_missing_columns(Tweet.__table__)
+        # create_all skips indexes on tables that already exist
+        for index in Tweet.__table__.indexes:
+            index.create(bind=engine, checkfirst=True)
+        search_index.setup(engine)
         print("Create Tables")
 
 def get_db():
-        try:
-            with Session(engine) as session:
+        with Session(engine) as session:
+            try:
+                yield session
+            except Exception:
+                session.rollback()
+                raise
+
+async def get_async_db():
+        async with AsyncSession(get_async_engine(), expire_on_commit=False) as session:
+            try:
                 yield session
-        except:
-            traceback.print_exc()
-        return None
+            except Exception:
+                await session.rollback()
+                raise
+
+async def dispose_engines():
+        if get_async_engine.cache_info().currsize:
+            await get_async_engine().dispose()
+        engine.dispose()
 
 # SessionDep=Annotated[Session,Depends(get_db)]
\ No newline at end of file
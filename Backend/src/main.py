@@ -1,9 +1,14 @@
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import RedirectResponse
+from fastapi.responses import RedirectResponse, PlainTextResponse
 from contextlib import asynccontextmanager
-from src.beans import   tweet_router
-from src.db import get_db,create_table
+from src.beans import   tweet_router, job_service, posting_scheduler
+from src.db import get_db,create_table,dispose_engines,engine
+from src.services.http_client import close_clients
+from src.services.image_service import image_processor
+from src.services.ai_service import start_warm_up
+from src.services.similarity_index import similarity_index
+from src.metrics import MetricsMiddleware, registry
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     try:
@@ -11,8 +16,17 @@ async def lifespan(app: FastAPI):
         if db:
 
             create_table()
+            similarity_index.start(engine)
+            job_service.start()
+            posting_scheduler.start()
+            start_warm_up()
 
             yield
+            posting_scheduler.stop()
+            job_service.stop()
+            await close_clients()
+            image_processor.shutdown()
+            await dispose_engines()
         else:
             print("Database not found")
     except Exception as e:
@@ -36,7 +50,12 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(MetricsMiddleware)
 @app.get("/", include_in_schema=False)
 async def root():
     return RedirectResponse(url="/docs")
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
 app.include_router(tweet_router.router)
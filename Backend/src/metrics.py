@@ -0,0 +1,267 @@
+import asyncio
+import re
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from src.config import SLOW_REQUEST_MS
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_labels(names: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Metric:
+    """Base for the metric types below; series are keyed by their label values."""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._series = {}
+        self._lock = threading.Lock()
+        registry.register(self)
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            series = sorted(self._series.items())
+        for key, value in series:
+            lines.extend(self._render_series(key, value))
+        return lines
+
+    def _render_series(self, key: tuple, value) -> list[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    @contextmanager
+    def track(self, **labels):
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = (), buckets: tuple = LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # per-bucket counts (non-cumulative), then sum and count
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            index = bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def _render_series(self, key: tuple, value) -> list[str]:
+        counts, total, count = value
+        lines, cumulative = [], 0
+        for bound, bucket_count in zip(self.buckets, counts):
+            cumulative += bucket_count
+            labels = _format_labels(self.labelnames, key, f'le="{_format_value(bound)}"')
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        labels = _format_labels(self.labelnames, key, 'le="+Inf"')
+        lines.append(f"{self.name}_bucket{labels} {count}")
+        plain = _format_labels(self.labelnames, key)
+        lines.append(f"{self.name}_sum{plain} {_format_value(total)}")
+        lines.append(f"{self.name}_count{plain} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric: Metric):
+        self.metrics.append(metric)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+STAGE_SECONDS = Histogram("tweet_stage_seconds", "Time spent in each tweet generation stage.", ("stage",))
+UPSTREAM_SECONDS = Histogram("upstream_request_seconds", "Latency of calls to external services, per attempt.",
+                             ("upstream", "status"))
+UPSTREAM_IN_FLIGHT = Gauge("upstream_requests_in_flight", "Calls to external services currently open.", ("upstream",))
+UPSTREAM_ERRORS = Counter("upstream_errors_total", "Failed calls to external services.", ("upstream", "reason"))
+DB_QUERY_SECONDS = Histogram("db_query_seconds", "SQL statement execution time.", ("operation", "table"),
+                             buckets=QUERY_BUCKETS)
+HTTP_REQUEST_SECONDS = Histogram("http_request_seconds", "HTTP request latency by route.",
+                                 ("method", "route", "status"))
+HTTP_IN_FLIGHT = Gauge("http_requests_in_flight", "HTTP requests currently being served.", ("method",))
+
+# Per-request stage totals for the slow-request log; None outside a request.
+_request_stages: ContextVar[dict | None] = ContextVar("request_stages", default=None)
+
+
+def record_stage(name: str, seconds: float):
+    stages = _request_stages.get()
+    if stages is not None:
+        stages[name] = stages.get(name, 0.0) + seconds
+
+
+@contextmanager
+def stage(name: str):
+    """Time a block as one workflow stage."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_SECONDS.observe(elapsed, stage=name)
+        record_stage(name, elapsed)
+
+
+@contextmanager
+def upstream_call(upstream: str):
+    """Time one call to an external service; set call["status"] to the response status."""
+    call = {"status": None}
+    started = time.perf_counter()
+    UPSTREAM_IN_FLIGHT.inc(upstream=upstream)
+    try:
+        yield call
+    except (GeneratorExit, asyncio.CancelledError):
+        # the caller went away (e.g. a closed stream), not an upstream failure
+        call["status"] = "cancelled"
+        raise
+    except BaseException as e:
+        call["status"] = "exception"
+        UPSTREAM_ERRORS.inc(upstream=upstream, reason=type(e).__name__)
+        raise
+    finally:
+        UPSTREAM_IN_FLIGHT.dec(upstream=upstream)
+        status = call["status"] or "ok"
+        if isinstance(status, int) and status >= 400:
+            UPSTREAM_ERRORS.inc(upstream=upstream, reason=str(status))
+        UPSTREAM_SECONDS.observe(time.perf_counter() - started, upstream=upstream, status=status)
+
+
+# --- SQL ---
+_TABLE_PATTERN = re.compile(r"\b(?:FROM|INTO|UPDATE(?!\s+OF\b)|TABLE)\s+(?:IF\s+(?:NOT\s+)?EXISTS\s+)?\"?(\w+)",
+                            re.IGNORECASE)
+
+
+def _statement_labels(statement: str) -> tuple[str, str]:
+    stripped = statement.lstrip()
+    operation = stripped.split(None, 1)[0].upper() if stripped else "UNKNOWN"
+    match = _TABLE_PATTERN.search(stripped)
+    return operation, match.group(1).lower() if match else ""
+
+
+def instrument_engine(engine: Engine):
+    """Observe every statement run through a (sync) engine; pass async_engine.sync_engine for async ones."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_started"].pop()
+        operation, table = _statement_labels(statement)
+        DB_QUERY_SECONDS.observe(elapsed, operation=operation, table=table)
+        record_stage("db", elapsed)
+
+    @event.listens_for(engine, "handle_error")
+    def _error(context):
+        started = context.connection.info.get("query_started") if context.connection is not None else None
+        if started:
+            started.pop()
+
+
+# --- HTTP ---
+class MetricsMiddleware:
+    """ASGI middleware recording per-route latency and logging slow requests with their stage breakdown."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        response = {"status": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+            await send(message)
+
+        method = scope["method"]
+        token = _request_stages.set({})
+        started = time.perf_counter()
+        HTTP_IN_FLIGHT.inc(method=method)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            HTTP_IN_FLIGHT.dec(method=method)
+            # the router stores the matched route on the scope; use its template to keep labels bounded
+            route = getattr(scope.get("route"), "path", "unmatched")
+            HTTP_REQUEST_SECONDS.observe(elapsed, method=method, route=route, status=response["status"])
+            if SLOW_REQUEST_MS and elapsed * 1000 >= SLOW_REQUEST_MS:
+                stages = ", ".join(f"{name}={seconds * 1000:.0f}ms"
+                                   for name, seconds in sorted(_request_stages.get().items(), key=lambda item: -item[1]))
+                print(f"Slow request: {method} {scope['path']} -> {response['status']} "
+                      f"in {elapsed * 1000:.0f}ms [{stages or 'no stages recorded'}]")
+            _request_stages.reset(token)
@@ -1,7 +1,18 @@
-from pydantic import BaseModel,ConfigDict
+from pydantic import BaseModel,ConfigDict,Field
 from datetime import datetime
 class PromptInput(BaseModel):
     topic: str
+    bypass_cache: bool = False
+    # generate the text again when it is a near-duplicate of a stored tweet
+    regenerate_duplicates: bool = False
+
+class BatchPromptInput(BaseModel):
+    topics: list[str]
+    max_concurrency: int | None = Field(default=None, ge=1, le=64)
+    bypass_cache: bool = False
+
+class ScheduleInput(BaseModel):
+    scheduled_at: datetime | None = None
 
 class TweetContent(BaseModel):
     content: str
@@ -11,6 +22,14 @@ class TweetUpdate(BaseModel):
     content: str | None = None
 
 
+class TweetImport(BaseModel):
+    topic: str = Field(min_length=1)
+    content: str = Field(min_length=1)
+    posted: bool = False
+    created_at: datetime | None = None
+    image_path: str | None = None
+
+
 class TweetOut(BaseModel):
     id: int
     topic: str
@@ -18,4 +37,40 @@ class TweetOut(BaseModel):
     posted: bool
     created_at: datetime
     image_path: str | None = None
+    image_webp_path: str | None = None
+    thumb_path: str | None = None
+    thumb_webp_path: str | None = None
+    scheduled_at: datetime | None = None
     model_config = ConfigDict(from_attributes=True)
+
+
+class JobOut(BaseModel):
+    id: str
+    topic: str
+    status: str
+    stage: str
+    progress: int
+    tweet_id: int | None = None
+    error: str | None = None
+    created_at: datetime
+    updated_at: datetime
+    model_config = ConfigDict(from_attributes=True)
+
+
+class OutboxOut(BaseModel):
+    id: int
+    tweet_id: int
+    status: str
+    due_at: datetime
+    attempts: int
+    last_error: str | None = None
+    created_at: datetime
+    updated_at: datetime
+    model_config = ConfigDict(from_attributes=True)
+
+
+class GeneratedTweet(BaseModel):
+    """Structured reply of the combined generation prompt."""
+    tweet: str = Field(min_length=1)
+    needs_image: bool
+    image_prompt: str | None = None
@@ -1,32 +1,135 @@
-from fastapi import APIRouter, Depends, Query,HTTPException
+from fastapi import APIRouter, Depends, Query,HTTPException, Request, Response, Header
+from fastapi.concurrency import run_in_threadpool
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from sqlmodel import Session
-from src.models.models import PromptInput, TweetUpdate, TweetOut
-from src.db import get_db  
+from src.models.models import PromptInput, BatchPromptInput, ScheduleInput, TweetUpdate, TweetOut, JobOut, OutboxOut
+from src.db import get_db, get_async_db
 from src.schemas.schema import Tweet
+from src.services.llm_cache import llm_cache
+from src.services.response_cache import response_cache, buckets_for
+from src.services.idempotency import idempotency_store
+from src.services.transfer_service import MEDIA_TYPES
+from src.services.similarity_index import similarity_index
+from src.services.image_index import image_index, etag_matches
+from src.config import IMAGE_MAX_AGE_SECONDS, DUPLICATE_MIN_SIMILARITY
+from src.services.image_service import image_variant_fields, image_version, remove_image_files, is_upload_path
 import os
+import json
 from pathlib import Path
-from fastapi.responses import FileResponse
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
+
+IMAGE_VARIANTS = {
+    ("full", "original"): "image_path",
+    ("full", "webp"): "image_webp_path",
+    ("thumb", "original"): "thumb_path",
+    ("thumb", "webp"): "thumb_webp_path",
+}
+
+
 class TweetRouter:
-    def __init__(self, tweet_service):
+    def __init__(self, tweet_service, job_service, posting_scheduler, transfer_service):
         self.tweet_service = tweet_service
+        self.job_service = job_service
+        self.posting_scheduler = posting_scheduler
+        self.transfer_service = transfer_service
         self.router = APIRouter(prefix="/tweet", tags=["Tweets"])
 
         self.router.post("/generate-tweet")(self.api_generate_tweet)
+        self.router.post("/generate-tweet/stream")(self.api_generate_tweet_stream)
+        self.router.post("/generate-batch")(self.api_generate_batch)
         self.router.post("/post-tweet/{tweet_id}")(self.api_post_tweet)
+        self.router.post("/schedule/{tweet_id}", response_model=OutboxOut)(self.schedule_tweet)
+        self.router.delete("/schedule/{tweet_id}", response_model=OutboxOut)(self.cancel_scheduled_tweet)
+        self.router.get("/outbox", response_model=list[OutboxOut])(self.get_outbox)
         self.router.put("/edit/{tweet_id}")(self.edit_tweet)
         self.router.get("/tweets")(self.get_all_tweets)
+        self.router.get("/export")(self.export_tweets)
+        self.router.get("/{tweet_id}/similar")(self.get_similar_tweets)
+        self.router.post("/import")(self.import_tweets)
         self.router.get("/image-generate/{tweet_id}")(self.get_generated_image)
         self.router.get("/image/{tweet_id}")(self.get_image)
         self.router.delete("/image/{tweet_id}")(self.delete_image)
+        self.router.get("/jobs/{job_id}", response_model=JobOut)(self.get_job)
+        self.router.get("/cache/stats")(self.get_cache_stats)
     
 
-    def api_generate_tweet(self, data: PromptInput, db: Session = Depends(get_db)):
-        return self.tweet_service.generate_tweet_service(data.topic, db)
+    @staticmethod
+    def _replay(record) -> Response:
+        return Response(content=record.response, status_code=record.status_code, media_type="application/json",
+                        headers={"Idempotent-Replayed": "true"})
+
+    async def api_generate_tweet(
+        self,
+        data: PromptInput,
+        mode: str = Query("sync", pattern="^(sync|job)$"),
+        idempotency_key: str | None = Header(None, max_length=255),
+        db: AsyncSession = Depends(get_async_db)
+    ):
+        payload = {"topic": data.topic, "bypass_cache": data.bypass_cache,
+                   "regenerate_duplicates": data.regenerate_duplicates, "mode": mode}
+        if idempotency_key:
+            record = await idempotency_store.alookup(idempotency_key, "generate-tweet", payload)
+            if record:
+                return self._replay(record)
+
+        if mode == "job":
+            job = await self.job_service.asubmit(data.topic, db, data.bypass_cache)
+            response = JSONResponse(
+                status_code=202,
+                content={"job_id": job.id, "status": job.status, "status_url": f"/tweet/jobs/{job.id}"},
+                headers={"Location": f"/tweet/jobs/{job.id}"}
+            )
+        else:
+            result = await self.tweet_service.agenerate_tweet_service(data.topic, data.bypass_cache,
+                                                                      data.regenerate_duplicates)
+            response = JSONResponse(content=jsonable_encoder(result))
+
+        if idempotency_key:
+            await idempotency_store.asave(idempotency_key, "generate-tweet", payload, response.status_code, response.body)
+        return response
+
+    async def api_generate_tweet_stream(self, data: PromptInput):
+        events = self.tweet_service.stream_tweet_service(data.topic, data.bypass_cache)
+        return StreamingResponse(
+            self._server_sent_events(events),
+            media_type="text/event-stream",
+            # stop proxies from buffering the stream
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
+
+    @staticmethod
+    async def _server_sent_events(events):
+        async for event, data in events:
+            yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+    async def api_generate_batch(self, data: BatchPromptInput, db: AsyncSession = Depends(get_async_db)):
+        return await self.tweet_service.agenerate_batch_service(data.topics, db, data.max_concurrency, data.bypass_cache)
+
+    def get_cache_stats(self):
+        return {**llm_cache.stats(), "listing": response_cache.stats(), "similarity": similarity_index.stats()}
+
+    def get_job(self, job_id: str, db: Session = Depends(get_db)):
+        return self.job_service.get_job(job_id, db)
 
     def api_post_tweet(self, tweet_id: int, db: Session = Depends(get_db)):
         return self.tweet_service.post_twitter(id=tweet_id, db=db)
 
+    def schedule_tweet(self, tweet_id: int, data: ScheduleInput | None = None, db: Session = Depends(get_db)):
+        return self.posting_scheduler.schedule(tweet_id, data.scheduled_at if data else None, db)
+
+    def cancel_scheduled_tweet(self, tweet_id: int, db: Session = Depends(get_db)):
+        return self.posting_scheduler.cancel(tweet_id, db)
+
+    def get_outbox(
+        self,
+        status: str | None = Query(None),
+        limit: int = Query(50, ge=1, le=500),
+        db: Session = Depends(get_db)
+    ):
+        return self.posting_scheduler.list_outbox(db, status, limit)
+
     def edit_tweet(self, tweet_id: int, tweet: TweetUpdate, db: Session = Depends(get_db)):
         result = self.tweet_service.update_tweet(tweet_id, tweet.topic, tweet.content, db=db)
         return {
@@ -34,31 +137,123 @@ class TweetRouter:
             "tweet": result
         }
 
-    def get_all_tweets(
+    async def get_all_tweets(
         self,
+        request: Request,
         posted: bool | None = Query(None),
         search: str | None = Query(None),
         limit: int = Query(10, ge=1),
         offset: int = Query(0, ge=0),
-        db: Session = Depends(get_db)
+        pagination: str = Query("offset", pattern="^(offset|cursor)$"),
+        cursor: str | None = Query(None),
+        count: str = Query("exact", pattern="^(exact|cached|estimated|none)$"),
+        db: AsyncSession = Depends(get_async_db)
+    ):
+        params = {"posted": posted, "search": search, "limit": limit, "offset": offset,
+                  "pagination": pagination, "cursor": cursor, "count": count}
+        key = await response_cache.akey(params)
+        headers = {"ETag": response_cache.etag(key), "Cache-Control": "private, no-cache"} if key else {}
+        if key and etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+            return Response(status_code=304, headers=headers)
+
+        body = await response_cache.aget(key) if key else None
+        if body is None:
+            result = await self.tweet_service.agetAll(db=db, posted=posted, search=search, limit=limit, offset=offset,
+                                               cursor=cursor, pagination=pagination, count=count)
+            result["items"] = [TweetOut.from_orm(tweet) for tweet in result["items"]]
+            body = JSONResponse(content=jsonable_encoder(result)).body
+            if key:
+                await response_cache.aset(key, body)
+        return Response(content=body, media_type="application/json", headers=headers)
+
+    async def get_similar_tweets(
+        self,
+        tweet_id: int,
+        min_similarity: float = Query(DUPLICATE_MIN_SIMILARITY, ge=0, le=1,
+                                      description="Estimated share of words in common; below ~0.5 matches are best-effort"),
+        limit: int = Query(10, ge=1, le=100),
+        db: AsyncSession = Depends(get_async_db)
     ):
-        result = self.tweet_service.getAll(db=db, posted=posted, search=search, limit=limit, offset=offset)
-        result["items"] = [TweetOut.from_orm(tweet) for tweet in result["items"]]
+        result = await self.tweet_service.aget_similar_tweets(tweet_id, db, min_similarity, limit)
+        for item in result["items"]:
+            item["tweet"] = TweetOut.from_orm(item["tweet"])
         return result
 
-    def get_generated_image(self, tweet_id: int, db: Session = Depends(get_db)):
-        return self.tweet_service.get_generated_image(tweet_id, db)
-    def get_image(self, tweet_id: int, db: Session = Depends(get_db)):
+    def export_tweets(
+        self,
+        posted: bool | None = Query(None),
+        search: str | None = Query(None),
+        format: str = Query("ndjson", pattern="^(ndjson|csv)$")
+    ):
+        query = self.transfer_service.export_query(posted, search)
+        return StreamingResponse(
+            self.transfer_service.export_stream(query, format),
+            media_type=MEDIA_TYPES[format],
+            headers={"Content-Disposition": f'attachment; filename="tweets.{format}"'}
+        )
+
+    async def import_tweets(self, request: Request, format: str = Query("ndjson", pattern="^(ndjson|csv)$")):
+        # the body is read here as a stream rather than through a model, so uploads of any size work
+        return await self.transfer_service.aimport_tweets(request.stream(), format)
+
+    def get_generated_image(self, tweet_id: int, idempotency_key: str | None = Header(None, max_length=255),
+                            db: Session = Depends(get_db)):
+        payload = {"tweet_id": tweet_id}
+        if idempotency_key:
+            record = idempotency_store.lookup(idempotency_key, "image-generate", payload)
+            if record:
+                return self._replay(record)
+
+        response = JSONResponse(content=jsonable_encoder(self.tweet_service.get_generated_image(tweet_id, db)))
+        if idempotency_key:
+            idempotency_store.save(idempotency_key, "image-generate", payload, response.status_code, response.body)
+        return response
+    @staticmethod
+    def _image_headers(etag: str, path: str, version: str | None) -> dict:
+        # Image files are write-once (uuid names), so a URL pinned to the file via ?v= never changes.
+        if version and version == image_version(path):
+            cache_control = f"public, max-age={IMAGE_MAX_AGE_SECONDS}, immutable"
+        else:
+            cache_control = "public, no-cache"
+        return {"ETag": etag, "Cache-Control": cache_control}
+
+    async def get_image(
+        self,
+        tweet_id: int,
+        request: Request,
+        size: str = Query("full", pattern="^(full|thumb)$"),
+        format: str = Query("original", pattern="^(original|webp)$"),
+        v: str | None = Query(None, description="Image file stem; pins the URL so it can be cached forever"),
+        db: AsyncSession = Depends(get_async_db)
+    ):
+        key = (tweet_id, f"{size}.{format}")
+        if_none_match = request.headers.get("if-none-match")
         try:
-            tweet: Tweet = self.tweet_service.get_single_tweet(tweet_id, db)
+            entry = image_index.lookup(key)
+            if entry and etag_matches(if_none_match, entry.etag):
+                return Response(status_code=304, headers=self._image_headers(entry.etag, entry.path, v))
+
+            tweet: Tweet = await self.tweet_service.aget_single_tweet(tweet_id, db)
             if not tweet or not tweet.image_path:
                 raise HTTPException(status_code=404, detail="Image path not found in tweet")
+            # a row holding a path outside the upload folder is never served
+            if not is_upload_path(tweet.image_path):
+                raise HTTPException(status_code=404, detail="Image file not found on disk")
             
-            image_path = Path(tweet.image_path)
+            # Fall back to the original when the variant was never produced.
+            variant_path = getattr(tweet, IMAGE_VARIANTS[(size, format)])
+            use_variant = variant_path and is_upload_path(variant_path) and Path(variant_path).exists()
+            image_path = Path(variant_path) if use_variant else Path(tweet.image_path)
             if not image_path.exists():
                 raise HTTPException(status_code=404, detail="Image file not found on disk")
 
-            return FileResponse(image_path, media_type="image/png", filename=image_path.name)
+            entry = await run_in_threadpool(image_index.resolve, key, str(image_path))
+            headers = self._image_headers(entry.etag, entry.path, v)
+            if etag_matches(if_none_match, entry.etag):
+                return Response(status_code=304, headers=headers)
+
+            # FileResponse answers Range / If-Range requests with 206 on its own.
+            return FileResponse(image_path, media_type=entry.media_type, filename=image_path.name, headers=headers)
         
         except HTTPException as http_exc:
             raise http_exc 
@@ -67,16 +262,22 @@ class TweetRouter:
             raise HTTPException(status_code=500, detail="Unexpected server error while fetching image")
 
     def delete_image(self, tweet_id: int, db: Session = Depends(get_db)) -> dict:
-        tweet = self.get_single_tweet(tweet_id, db)
+        tweet = self.tweet_service.get_single_tweet(tweet_id, db)
         if not tweet or not tweet.image_path:
             raise HTTPException(status_code=404, detail="Tweet or image not found")
+        if not is_upload_path(tweet.image_path):
+            raise HTTPException(status_code=404, detail="Image file not found on disk")
 
         try:
             if os.path.exists(tweet.image_path):
-                os.remove(tweet.image_path)
+                remove_image_files(tweet.image_path)
                 tweet.image_path = None
+                for field, value in image_variant_fields(None).items():
+                    setattr(tweet, field, value)
                 db.add(tweet)
                 db.commit()
+                image_index.invalidate(tweet_id)
+                self.tweet_service._tweets_changed(*buckets_for(tweet.posted))
                 return {"message": "Image deleted successfully."}
             else:
                 raise HTTPException(status_code=404, detail="Image file not found on disk")
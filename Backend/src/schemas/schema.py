@@ -1,12 +1,64 @@
 from sqlmodel import SQLModel, Field
+from sqlalchemy import Index, LargeBinary
 from typing import Optional
 from datetime import datetime
+import uuid
 
 class Tweet(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_tweet_posted_id", "posted", "id"),
+        Index("ix_tweet_posted_created_at", "posted", "created_at"),
+        Index("ix_tweet_created_at", "created_at"),
+    )
     id: Optional[int] = Field(default=None, primary_key=True)
     content: str
     topic: str
     image_path: Optional[str] = None
+    image_webp_path: Optional[str] = None
+    thumb_path: Optional[str] = None
+    thumb_webp_path: Optional[str] = None
     created_at: datetime = Field(default_factory=datetime.utcnow)
     posted: bool = False
-   
\ No newline at end of file
+    scheduled_at: Optional[datetime] = None
+    # MinHash signature of content for near-duplicate lookups, see services/similarity_index.py
+    minhash: Optional[bytes] = Field(default=None, sa_type=LargeBinary, exclude=True, repr=False)
+
+
+class GenerationJob(SQLModel, table=True):
+    id: str = Field(default_factory=lambda: uuid.uuid4().hex, primary_key=True)
+    topic: str
+    status: str = Field(default="queued", index=True)
+    stage: str = "queued"
+    progress: int = 0
+    bypass_cache: bool = False
+    tweet_id: Optional[int] = Field(default=None, foreign_key="tweet.id")
+    error: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class LLMCacheEntry(SQLModel, table=True):
+    key: str = Field(primary_key=True)
+    kind: str
+    value: str
+    created_at: datetime = Field(default_factory=datetime.utcnow, index=True)
+
+
+class OutboxItem(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    tweet_id: int = Field(foreign_key="tweet.id", unique=True)
+    status: str = Field(default="pending", index=True)
+    due_at: datetime = Field(default_factory=datetime.utcnow, index=True)
+    attempts: int = 0
+    last_error: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class IdempotencyRecord(SQLModel, table=True):
+    key: str = Field(primary_key=True)
+    scope: str
+    request_hash: str
+    status_code: int
+    response: str
+    created_at: datetime = Field(default_factory=datetime.utcnow, index=True)
@@ -1,97 +1,390 @@
 import os
+import re
+import json
 import uuid
-import requests
+import asyncio
+import threading
 from fastapi import HTTPException
-from src.config import GIMINI_API_KEY, HUGGINGFACE_TOKEN
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain.prompts import PromptTemplate
+from pydantic import ValidationError
+from src.config import (GIMINI_API_KEY, HUGGINGFACE_TOKEN, HUGGINGFACE_URL, LLM_PROVIDER, LLM_WARMUP,
+                        STUB_LLM_LATENCY_MS, STUB_LLM_ERROR_RATE, STUB_LLM_IMAGE_RATIO, GENERATION_MODE)
+from src.models.models import GeneratedTweet
+from src.services.llm_cache import llm_cache
+from src.services.http_client import huggingface_client, CircuitOpenError
+from src.services.image_service import image_processor, UPLOAD_FOLDER
+from src.metrics import stage, upstream_call
 
 
 # Set environment for Gemini
-os.environ["GOOGLE_API_KEY"] = GIMINI_API_KEY
-UPLOAD_FOLDER = "upload"
+if GIMINI_API_KEY:
+    os.environ["GOOGLE_API_KEY"] = GIMINI_API_KEY
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+HF_IMAGE_URL = HUGGINGFACE_URL
+LLM_MODEL = "gemini-2.0-flash" if LLM_PROVIDER != "stub" else "stub"
 
-# --- Initialize Gemini for tweet and agentic check ---
-try:
-    llm = ChatGoogleGenerativeAI(model="gemini-2.0-flash", temperature=0.7)
-
-    tweet_prompt = PromptTemplate(
-        input_variables=["topic"],
-        template="Write a short and engaging tweet about {topic} in under 380 characters. Add hashtags if relevant."
-    )
-    tweet_chain = tweet_prompt | llm
-
-    image_decision_prompt = PromptTemplate(
-        input_variables=["topic"],
-        template="Answer with only YES or NO. Does the topic '{topic}' need a visual image to make the tweet more impactful?"
-    )
-    decision_chain = image_decision_prompt | llm
-
-except Exception as e:
-    print(f"Error initializing LLM: {e}")
-    raise HTTPException(
-        status_code=500,
-        detail="Failed to initialize the language model."
-    )
+TWEET_TEMPLATE = "Write a short and engaging tweet about {topic} in under 380 characters. Add hashtags if relevant."
+IMAGE_DECISION_TEMPLATE = "Answer with only YES or NO. Does the topic '{topic}' need a visual image to make the tweet more impactful?"
+COMBINED_TEMPLATE = (
+    "Write a short and engaging tweet about {topic} in under 380 characters. Add hashtags if relevant. "
+    "Then decide whether the tweet needs a visual image to be more impactful and, if it does, write a "
+    "detailed prompt for a text-to-image model describing that image. "
+    "Respond with only a JSON object with the keys \"tweet\" (string), \"needs_image\" (true or false) "
+    "and \"image_prompt\" (string, or null when no image is needed)."
+)
 
-# --- Tweet Generator ---
-def generate_tweet(topic: str) -> str:
+# --- Lazy Gemini client and chains ---
+# langchain and the Google client take seconds to import, so they are loaded on
+# first use (or by warm_up in the background) instead of when this module loads.
+_llm = None
+_chains = {}
+_llm_lock = threading.Lock()
+
+def get_llm():
+    global _llm
+    if _llm is None:
+        with _llm_lock:
+            if _llm is None:
+                try:
+                    if LLM_PROVIDER == "stub":
+                        from src.services.llm_stub import StubChatModel
+                        _llm = StubChatModel(latency_ms=STUB_LLM_LATENCY_MS, error_rate=STUB_LLM_ERROR_RATE,
+                                             image_ratio=STUB_LLM_IMAGE_RATIO)
+                    else:
+                        from langchain_google_genai import ChatGoogleGenerativeAI
+                        _llm = ChatGoogleGenerativeAI(model=LLM_MODEL, temperature=0.7)
+                except Exception as e:
+                    print(f"Error initializing LLM: {e}")
+                    raise HTTPException(
+                        status_code=500,
+                        detail="Failed to initialize the language model."
+                    )
+    return _llm
+
+def _get_chain(name: str, template: str):
+    chain = _chains.get(name)
+    if chain is None:
+        llm = get_llm()
+        with _llm_lock:
+            chain = _chains.get(name)
+            if chain is None:
+                from langchain_core.prompts import PromptTemplate
+                prompt = PromptTemplate(input_variables=["topic"], template=template)
+                chain = _chains[name] = prompt | llm
+    return chain
+
+def get_tweet_chain():
+    return _get_chain("tweet", TWEET_TEMPLATE)
+
+def get_decision_chain():
+    return _get_chain("decision", IMAGE_DECISION_TEMPLATE)
+
+async def aget_tweet_chain():
+    # the first call imports langchain, keep that off the event loop
+    return _chains.get("tweet") or await asyncio.to_thread(get_tweet_chain)
+
+async def aget_decision_chain():
+    return _chains.get("decision") or await asyncio.to_thread(get_decision_chain)
+
+def get_combined_chain():
+    return _get_chain("combined", COMBINED_TEMPLATE)
+
+async def aget_combined_chain():
+    return _chains.get("combined") or await asyncio.to_thread(get_combined_chain)
+
+def warm_up():
+    try:
+        if GENERATION_MODE == "combined":
+            get_combined_chain()
+        get_tweet_chain()
+        get_decision_chain()
+        print("LLM client initialized")
+    except Exception as e:
+        print(f"LLM warm-up failed, will retry on first request: {e}")
+
+def start_warm_up():
+    if LLM_WARMUP:
+        threading.Thread(target=warm_up, name="llm-warmup", daemon=True).start()
+
+# --- Cache keys ---
+def _tweet_key(topic: str) -> str:
+    return llm_cache.make_key(topic, TWEET_TEMPLATE, LLM_MODEL)
+
+def _decision_key(topic: str) -> str:
+    return llm_cache.make_key(topic, IMAGE_DECISION_TEMPLATE, LLM_MODEL)
+
+def _combined_key(topic: str) -> str:
+    return llm_cache.make_key(topic, COMBINED_TEMPLATE, LLM_MODEL)
+
+def _validate_topic(topic: str):
     if not topic:
         raise HTTPException(status_code=400, detail="Topic cannot be empty")
     if len(topic) > 100:
         raise HTTPException(status_code=400, detail="Topic must be under 100 characters")
 
+# --- Tweet Generator ---
+def generate_tweet(topic: str, bypass_cache: bool = False) -> str:
+    _validate_topic(topic)
+
+    key = _tweet_key(topic)
+    if not bypass_cache:
+        cached = llm_cache.get(key, "tweet")
+        if cached is not None:
+            return cached
     try:
-        return tweet_chain.invoke({"topic": topic}).content.strip()
+        chain = get_tweet_chain()
+        with stage("tweet_text"), upstream_call("gemini"):
+            tweet = chain.invoke({"topic": topic}).content.strip()
     except Exception as e:
         print(f"Error generating tweet: {e}")
         raise HTTPException(status_code=500, detail="Failed to generate tweet")
+    llm_cache.set(key, "tweet", tweet)
+    return tweet
 
 # --- Agentic Check using Gemini ---
 def should_generate_image(topic: str) -> bool:
+    key = _decision_key(topic)
+    cached = llm_cache.get(key, "decision")
+    if cached is not None:
+        return cached == "YES"
     try:
-        result = decision_chain.invoke({"topic": topic}).content.strip().upper()
+        chain = get_decision_chain()
+        with stage("image_decision"), upstream_call("gemini"):
+            result = chain.invoke({"topic": topic}).content.strip().upper()
         print(f"Image decision for topic '{topic}': {result}")
+        llm_cache.set(key, "decision", result)
         return result == "YES"
     except Exception as e:
         print(f"Error checking image need: {e}")
         return False
 
-# --- Image Generator via HF API ---
-def generate_image(topic: str) -> str:
+# --- Combined tweet and image decision ---
+_JSON_OBJECT = re.compile(r"\{.*\}", re.DOTALL)
+
+def parse_generated_tweet(text: str) -> GeneratedTweet | None:
+    """Validate the combined prompt's reply; None when it is not the expected JSON object."""
+    # models often wrap JSON in a ```json fence or add a sentence around it
+    match = _JSON_OBJECT.search(text or "")
+    if match is None:
+        return None
     try:
-        prompt = f"Create a high-quality image based on the topic: {topic}. The image should be visually appealing and relevant to the topic. Use vibrant colors and clear details."
+        return GeneratedTweet.model_validate(json.loads(match.group(0)))
+    except (ValueError, ValidationError):
+        return None
 
-        headers = {"Authorization": f"Bearer {HUGGINGFACE_TOKEN}"}
-        payload = {"inputs": prompt}
+def generate_structured(topic: str, bypass_cache: bool = False) -> GeneratedTweet | None:
+    """Tweet text and image decision from one LLM call.
 
-        response = requests.post(
-            "https://api-inference.huggingface.co/models/black-forest-labs/FLUX.1-dev",
-            headers=headers,
-            json=payload
-        )
+    Returns None when GENERATION_MODE is not "combined" or the reply does not
+    parse, callers then fall back to generate_tweet and should_generate_image.
+    """
+    if GENERATION_MODE != "combined":
+        return None
+    _validate_topic(topic)
+
+    key = _combined_key(topic)
+    if not bypass_cache:
+        cached = llm_cache.get(key, "combined")
+        if cached is not None:
+            return GeneratedTweet.model_validate_json(cached)
+    try:
+        chain = get_combined_chain()
+        with stage("tweet_structured"), upstream_call("gemini"):
+            text = chain.invoke({"topic": topic}).content
+    except Exception as e:
+        print(f"Error generating tweet: {e}")
+        raise HTTPException(status_code=500, detail="Failed to generate tweet")
+    generated = parse_generated_tweet(text)
+    if generated is None:
+        print(f"Unparseable structured reply for topic '{topic}', falling back to separate calls")
+        return None
+    print(f"Image decision for topic '{topic}': {'YES' if generated.needs_image else 'NO'}")
+    llm_cache.set(key, "combined", generated.model_dump_json())
+    return generated
+
+# --- Image Generator via HF API ---
+def _image_request(topic: str, prompt: str | None = None) -> tuple[dict, dict]:
+    prompt = prompt or f"Create a high-quality image based on the topic: {topic}. The image should be visually appealing and relevant to the topic. Use vibrant colors and clear details."
+    headers = {"Authorization": f"Bearer {HUGGINGFACE_TOKEN}"}
+    payload = {"inputs": prompt}
+    return headers, payload
+
+def _save_image(content: bytes) -> str:
+    image_id = uuid.uuid4()
+    image_path = f"{UPLOAD_FOLDER}/image_{image_id}.png"
+    with open(image_path, "wb") as f:
+        f.write(content)
+    print(f"Image saved to {image_path}")
+    return image_path
+
+def generate_image(topic: str, prompt: str | None = None) -> str:
+    try:
+        headers, payload = _image_request(topic, prompt)
+
+        with stage("image_generate"):
+            response = huggingface_client.post(
+                HF_IMAGE_URL,
+                headers=headers,
+                json=payload
+            )
 
         if response.status_code == 200:
-            image_id = uuid.uuid4()
-            image_path = f"{UPLOAD_FOLDER}/image_{image_id}.png"
-            with open(image_path, "wb") as f:
-                f.write(response.content)
-            print(f"Image saved to {image_path}")
+            with stage("image_save"):
+                image_path = _save_image(response.content)
+                image_processor.process(image_path)
             return image_path
         else:
             raise HTTPException(status_code=500, detail=f"HuggingFace API error: {response.status_code} - {response.text}")
+    except CircuitOpenError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         print(f"Error generating image: {e}")
         raise HTTPException(status_code=500, detail="An error occurred while generating the image.")
 
 # --- Main Agentic Handler ---
-def agentic_tweet_workflow(topic: str) -> dict:
-    tweet = generate_tweet(topic)
-    image_path = None
+def agentic_tweet_workflow(topic: str, bypass_cache: bool = False) -> dict:
+    with stage("workflow"):
+        generated = generate_structured(topic, bypass_cache)
+        if generated is not None:
+            tweet, needs_image, image_prompt = generated.tweet, generated.needs_image, generated.image_prompt
+        else:
+            tweet, needs_image, image_prompt = generate_tweet(topic, bypass_cache), should_generate_image(topic), None
+
+        image_path = generate_image(topic, image_prompt) if needs_image else None
+
+    return {
+        "topic": topic,
+        "tweet": tweet,
+        "image": image_path or None
+    }
+
+# --- Async variants ---
+async def agenerate_tweet(topic: str, bypass_cache: bool = False) -> str:
+    _validate_topic(topic)
+
+    key = _tweet_key(topic)
+    if not bypass_cache:
+        cached = await llm_cache.aget(key, "tweet")
+        if cached is not None:
+            return cached
+    try:
+        chain = await aget_tweet_chain()
+        with stage("tweet_text"), upstream_call("gemini"):
+            result = await chain.ainvoke({"topic": topic})
+        tweet = result.content.strip()
+    except Exception as e:
+        print(f"Error generating tweet: {e}")
+        raise HTTPException(status_code=500, detail="Failed to generate tweet")
+    await llm_cache.aset(key, "tweet", tweet)
+    return tweet
+
+async def agenerate_structured(topic: str, bypass_cache: bool = False) -> GeneratedTweet | None:
+    if GENERATION_MODE != "combined":
+        return None
+    _validate_topic(topic)
 
-    if should_generate_image(topic):
-        image_path = generate_image(topic)
+    key = _combined_key(topic)
+    if not bypass_cache:
+        cached = await llm_cache.aget(key, "combined")
+        if cached is not None:
+            return GeneratedTweet.model_validate_json(cached)
+    try:
+        chain = await aget_combined_chain()
+        with stage("tweet_structured"), upstream_call("gemini"):
+            text = (await chain.ainvoke({"topic": topic})).content
+    except Exception as e:
+        print(f"Error generating tweet: {e}")
+        raise HTTPException(status_code=500, detail="Failed to generate tweet")
+    generated = parse_generated_tweet(text)
+    if generated is None:
+        print(f"Unparseable structured reply for topic '{topic}', falling back to separate calls")
+        return None
+    print(f"Image decision for topic '{topic}': {'YES' if generated.needs_image else 'NO'}")
+    await llm_cache.aset(key, "combined", generated.model_dump_json())
+    return generated
+
+async def astream_tweet(topic: str, bypass_cache: bool = False):
+    """Yield the tweet text in chunks as the model produces them; a cached tweet comes as one chunk."""
+    _validate_topic(topic)
+
+    key = _tweet_key(topic)
+    if not bypass_cache:
+        cached = await llm_cache.aget(key, "tweet")
+        if cached is not None:
+            yield cached
+            return
+    chunks = []
+    try:
+        chain = await aget_tweet_chain()
+        with stage("tweet_text"), upstream_call("gemini"):
+            async for chunk in chain.astream({"topic": topic}):
+                if chunk.content:
+                    chunks.append(chunk.content)
+                    yield chunk.content
+    except Exception as e:
+        print(f"Error streaming tweet: {e}")
+        raise HTTPException(status_code=500, detail="Failed to generate tweet")
+    await llm_cache.aset(key, "tweet", "".join(chunks).strip())
+
+async def ashould_generate_image(topic: str) -> bool:
+    key = _decision_key(topic)
+    cached = await llm_cache.aget(key, "decision")
+    if cached is not None:
+        return cached == "YES"
+    try:
+        chain = await aget_decision_chain()
+        with stage("image_decision"), upstream_call("gemini"):
+            result = (await chain.ainvoke({"topic": topic})).content.strip().upper()
+        print(f"Image decision for topic '{topic}': {result}")
+        await llm_cache.aset(key, "decision", result)
+        return result == "YES"
+    except Exception as e:
+        print(f"Error checking image need: {e}")
+        return False
+
+async def agenerate_image(topic: str, prompt: str | None = None) -> str:
+    try:
+        headers, payload = _image_request(topic, prompt)
+
+        with stage("image_generate"):
+            response = await huggingface_client.apost(HF_IMAGE_URL, headers=headers, json=payload)
+
+        if response.status_code == 200:
+            with stage("image_save"):
+                image_path = await asyncio.to_thread(_save_image, response.content)
+                await image_processor.aprocess(image_path)
+            return image_path
+        else:
+            raise HTTPException(status_code=500, detail=f"HuggingFace API error: {response.status_code} - {response.text}")
+    except CircuitOpenError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        print(f"Error generating image: {e}")
+        raise HTTPException(status_code=500, detail="An error occurred while generating the image.")
+
+async def _image_branch(topic: str) -> str | None:
+    if await ashould_generate_image(topic):
+        return await agenerate_image(topic)
+    return None
+
+async def agentic_tweet_workflow_async(topic: str, bypass_cache: bool = False) -> dict:
+    with stage("workflow"):
+        generated = await agenerate_structured(topic, bypass_cache)
+        if generated is not None:
+            tweet = generated.tweet
+            image_path = await agenerate_image(topic, generated.image_prompt) if generated.needs_image else None
+        else:
+            # Separate calls: tweet text and the image decision are independent, so they run side by side;
+            # the image request starts as soon as the decision comes back.
+            tasks = [
+                asyncio.create_task(agenerate_tweet(topic, bypass_cache)),
+                asyncio.create_task(_image_branch(topic)),
+            ]
+            try:
+                tweet, image_path = await asyncio.gather(*tasks)
+            except BaseException:
+                for task in tasks:
+                    task.cancel()
+                raise
 
     return {
         "topic": topic,
@@ -99,6 +392,140 @@ def agentic_tweet_workflow(topic: str) -> dict:
         "image": image_path or None
     }
 
+# --- Batch variants ---
+def _error_detail(error: BaseException) -> str:
+    return str(error.detail) if isinstance(error, HTTPException) else str(error)
+
+class StructuredOutputError(ValueError):
+    """The combined prompt's reply did not match the GeneratedTweet schema."""
+
+_BATCH_STAGES = {"tweet": "tweet_text_batch", "decision": "image_decision_batch", "combined": "tweet_structured_batch"}
+
+def _batch_output(kind: str, content: str) -> str:
+    if kind == "decision":
+        return content.strip().upper()
+    if kind == "combined":
+        generated = parse_generated_tweet(content)
+        if generated is None:
+            raise StructuredOutputError("Unparseable structured reply")
+        return generated.model_dump_json()
+    return content.strip()
+
+async def _cached_batch(chain, kind: str, keys: list[str], topics: list[str], max_concurrency: int,
+                        bypass_cache: bool = False) -> list[str | Exception]:
+    # Only topics missing from the cache are sent to the LLM.
+    outputs = [None] * len(topics)
+    if not bypass_cache:
+        outputs = list(await asyncio.gather(*(llm_cache.aget(key, kind) for key in keys)))
+    missing = [i for i, output in enumerate(outputs) if output is None]
+    if missing:
+        with stage(_BATCH_STAGES[kind]):
+            results = await chain.abatch(
+                [{"topic": topics[i]} for i in missing],
+                config={"max_concurrency": max_concurrency},
+                return_exceptions=True
+            )
+        for i, result in zip(missing, results):
+            if isinstance(result, Exception):
+                outputs[i] = result
+                continue
+            try:
+                outputs[i] = _batch_output(kind, result.content)
+            except StructuredOutputError as e:
+                outputs[i] = e
+                continue
+            await llm_cache.aset(keys[i], kind, outputs[i])
+    return outputs
+
+async def agenerate_tweets_batch(topics: list[str], max_concurrency: int,
+                                 bypass_cache: bool = False) -> list[str | Exception]:
+    keys = [_tweet_key(topic) for topic in topics]
+    return await _cached_batch(await aget_tweet_chain(), "tweet", keys, topics, max_concurrency, bypass_cache)
+
+async def ashould_generate_images_batch(topics: list[str], max_concurrency: int) -> list[bool]:
+    keys = [_decision_key(topic) for topic in topics]
+    results = await _cached_batch(await aget_decision_chain(), "decision", keys, topics, max_concurrency)
+    decisions = []
+    for topic, result in zip(topics, results):
+        if isinstance(result, Exception):
+            print(f"Error checking image need for topic '{topic}': {result}")
+            decisions.append(False)
+        else:
+            decisions.append(result == "YES")
+    return decisions
+
+async def agenerate_structured_batch(topics: list[str], max_concurrency: int,
+                                     bypass_cache: bool = False) -> list[GeneratedTweet | Exception]:
+    """Combined-mode batch; topics whose reply fails to parse come back as StructuredOutputError."""
+    keys = [_combined_key(topic) for topic in topics]
+    outputs = await _cached_batch(await aget_combined_chain(), "combined", keys, topics, max_concurrency,
+                                  bypass_cache)
+    return [output if isinstance(output, Exception) else GeneratedTweet.model_validate_json(output)
+            for output in outputs]
+
+async def agenerate_images_bounded(topics: list[str], concurrency: int,
+                                   prompts: list[str | None] | None = None) -> list[str | BaseException]:
+    slots = asyncio.Semaphore(concurrency)
+
+    async def _one(topic: str, prompt: str | None) -> str:
+        async with slots:
+            return await agenerate_image(topic, prompt)
+
+    prompts = prompts or [None] * len(topics)
+    return await asyncio.gather(*(_one(topic, prompt) for topic, prompt in zip(topics, prompts)),
+                                return_exceptions=True)
+
+async def agentic_tweet_batch(topics: list[str], max_concurrency: int, image_concurrency: int,
+                              bypass_cache: bool = False) -> list[dict]:
+    """Run the agentic workflow for many topics; failures are reported per topic."""
+    results = [
+        {"topic": topic, "tweet": None, "image": None, "error": None}
+        for topic in topics
+    ]
+    decisions = [False] * len(topics)
+    image_prompts = [None] * len(topics)
+
+    # Combined mode first; only topics whose reply fails to parse take the two-call path.
+    separate = list(range(len(topics)))
+    if GENERATION_MODE == "combined":
+        separate = []
+        generated = await agenerate_structured_batch(topics, max_concurrency, bypass_cache)
+        for i, output in enumerate(generated):
+            if isinstance(output, StructuredOutputError):
+                separate.append(i)
+            elif isinstance(output, Exception):
+                print(f"Error generating tweet for topic '{topics[i]}': {output}")
+                results[i]["error"] = "Failed to generate tweet"
+            else:
+                results[i]["tweet"] = output.tweet
+                decisions[i] = output.needs_image
+                image_prompts[i] = output.image_prompt
+
+    if separate:
+        separate_topics = [topics[i] for i in separate]
+        texts, separate_decisions = await asyncio.gather(
+            agenerate_tweets_batch(separate_topics, max_concurrency, bypass_cache),
+            ashould_generate_images_batch(separate_topics, max_concurrency)
+        )
+        for i, text, decision in zip(separate, texts, separate_decisions):
+            if isinstance(text, Exception):
+                print(f"Error generating tweet for topic '{topics[i]}': {text}")
+                results[i]["error"] = "Failed to generate tweet"
+            else:
+                results[i]["tweet"] = text
+            decisions[i] = decision
+
+    # Images only for topics whose text succeeded, in their own bounded stage.
+    image_indexes = [i for i, result in enumerate(results) if result["error"] is None and decisions[i]]
+    images = await agenerate_images_bounded([topics[i] for i in image_indexes], image_concurrency,
+                                            [image_prompts[i] for i in image_indexes])
+    for i, image in zip(image_indexes, images):
+        if isinstance(image, BaseException):
+            results[i]["error"] = _error_detail(image)
+        else:
+            results[i]["image"] = image
+    return results
+
 # --- Test Main ---
 if __name__ == "__main__":
     result = agentic_tweet_workflow("The power of AI in space exploration")
@@ -0,0 +1,229 @@
+import asyncio
+import random
+import threading
+import time
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+
+from src.config import (HTTP_POOL_SIZE, HTTP_BACKOFF_BASE_SECONDS, HTTP_BACKOFF_MAX_SECONDS,
+                        CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RESET_SECONDS,
+                        HF_CONNECT_TIMEOUT_SECONDS, HF_READ_TIMEOUT_SECONDS, HF_MAX_RETRIES,
+                        TWITTER_CONNECT_TIMEOUT_SECONDS, TWITTER_READ_TIMEOUT_SECONDS, TWITTER_MAX_RETRIES)
+from src.metrics import upstream_call, UPSTREAM_ERRORS
+
+
+class CircuitOpenError(Exception):
+    def __init__(self, name: str, retry_in: float):
+        super().__init__(f"{name} is unavailable, retry in {retry_in:.0f}s")
+        self.name = name
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    """Opens after `threshold` consecutive failures and lets one probe through after `reset_timeout`."""
+
+    def __init__(self, name: str, threshold: int = CIRCUIT_FAILURE_THRESHOLD, reset_timeout: float = CIRCUIT_RESET_SECONDS):
+        self.name = name
+        self.threshold = max(1, threshold)
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self.opened_at is None:
+                return "closed"
+            if time.monotonic() - self.opened_at >= self.reset_timeout:
+                return "half_open"
+            return "open"
+
+    def before_call(self) -> bool:
+        """Raise CircuitOpenError while open; True when this call is the half-open probe."""
+        with self._lock:
+            if self.opened_at is None:
+                return False
+            elapsed = time.monotonic() - self.opened_at
+            if elapsed < self.reset_timeout or self._probing:
+                raise CircuitOpenError(self.name, max(0.0, self.reset_timeout - elapsed))
+            self._probing = True
+            return True
+
+    def release_probe(self):
+        """The probe ended without an outcome (e.g. it was cancelled); let the next call probe instead."""
+        with self._lock:
+            self._probing = False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._probing or self.failures >= self.threshold:
+                if self.opened_at is None or self._probing:
+                    print(f"Circuit for {self.name} opened after {self.failures} failures")
+                self.opened_at = time.monotonic()
+            self._probing = False
+
+
+class UpstreamClient:
+    """Keep-alive HTTP client for one upstream, with timeouts, jittered retries and a circuit breaker.
+
+    `post` uses a pooled requests.Session for sync callers, `apost` a shared
+    httpx.AsyncClient. When retries run out the last response is returned so
+    callers keep their own status handling.
+    """
+
+    def __init__(self, name: str, connect_timeout: float, read_timeout: float, max_retries: int,
+                 retry_statuses: tuple[int, ...] = (429, 500, 502, 503, 504), retry_read_errors: bool = True,
+                 pool_size: int = HTTP_POOL_SIZE):
+        self.name = name
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max(0, max_retries)
+        self.retry_statuses = retry_statuses
+        self.retry_read_errors = retry_read_errors
+        self.pool_size = pool_size
+        self.breaker = CircuitBreaker(name)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._async_client: httpx.AsyncClient | None = None
+
+    @property
+    def async_client(self) -> httpx.AsyncClient:
+        if self._async_client is None:
+            self._async_client = httpx.AsyncClient(
+                timeout=httpx.Timeout(self.timeout[1], connect=self.timeout[0]),
+                limits=httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size)
+            )
+        return self._async_client
+
+    def _backoff(self, attempt: int, retry_after: str | None) -> float:
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), HTTP_BACKOFF_MAX_SECONDS)
+        # Full jitter: uniform in [0, min(max, base * 2^attempt)]
+        return random.uniform(0, min(HTTP_BACKOFF_MAX_SECONDS, HTTP_BACKOFF_BASE_SECONDS * 2 ** attempt))
+
+    @staticmethod
+    def _connect_failed(error: Exception) -> bool:
+        """True only when no connection was made, so the request never reached the upstream."""
+        if isinstance(error, (requests.exceptions.ConnectTimeout, httpx.ConnectError, httpx.ConnectTimeout)):
+            return True
+        if isinstance(error, requests.ConnectionError):
+            # requests wraps connect failures in MaxRetryError; "Connection aborted" after the
+            # request was written arrives as a ProtocolError instead
+            cause = error.args[0] if error.args else None
+            return isinstance(getattr(cause, "reason", cause), NewConnectionError)
+        return False
+
+    def _retryable_error(self, error: Exception) -> bool:
+        if self._connect_failed(error):
+            return True
+        if isinstance(error, (requests.ConnectionError, requests.Timeout, httpx.TimeoutException, httpx.ReadError)):
+            # the upstream may already have acted on the request
+            return self.retry_read_errors
+        return False
+
+    def _before_call(self) -> bool:
+        try:
+            return self.breaker.before_call()
+        except CircuitOpenError:
+            UPSTREAM_ERRORS.inc(upstream=self.name, reason="circuit_open")
+            raise
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        probe = self._before_call()
+        kwargs.setdefault("timeout", self.timeout)
+        try:
+            for attempt in range(self.max_retries + 1):
+                try:
+                    with upstream_call(self.name) as call:
+                        response = self.session.post(url, **kwargs)
+                        call["status"] = response.status_code
+                except requests.RequestException as e:
+                    if attempt < self.max_retries and self._retryable_error(e):
+                        time.sleep(self._backoff(attempt, None))
+                        continue
+                    self.breaker.record_failure()
+                    raise
+                except Exception:
+                    self.breaker.record_failure()
+                    raise
+                if response.status_code in self.retry_statuses and attempt < self.max_retries:
+                    print(f"{self.name} returned {response.status_code}, retrying ({attempt + 1}/{self.max_retries})")
+                    time.sleep(self._backoff(attempt, response.headers.get("Retry-After")))
+                    continue
+                self._record(response.status_code)
+                return response
+        except BaseException:
+            # a probe that ends without an outcome must not hold the breaker half-open forever
+            if probe:
+                self.breaker.release_probe()
+            raise
+
+    async def apost(self, url: str, **kwargs) -> httpx.Response:
+        probe = self._before_call()
+        try:
+            for attempt in range(self.max_retries + 1):
+                try:
+                    with upstream_call(self.name) as call:
+                        response = await self.async_client.post(url, **kwargs)
+                        call["status"] = response.status_code
+                except httpx.HTTPError as e:
+                    if attempt < self.max_retries and self._retryable_error(e):
+                        await asyncio.sleep(self._backoff(attempt, None))
+                        continue
+                    self.breaker.record_failure()
+                    raise
+                except Exception:
+                    self.breaker.record_failure()
+                    raise
+                if response.status_code in self.retry_statuses and attempt < self.max_retries:
+                    print(f"{self.name} returned {response.status_code}, retrying ({attempt + 1}/{self.max_retries})")
+                    await asyncio.sleep(self._backoff(attempt, response.headers.get("Retry-After")))
+                    continue
+                self._record(response.status_code)
+                return response
+        except BaseException:
+            # cancellation (a failed sibling task, an SSE client going away) only gives the probe back
+            if probe:
+                self.breaker.release_probe()
+            raise
+
+    def _record(self, status_code: int):
+        if status_code in self.retry_statuses:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+
+    async def aclose(self):
+        self.session.close()
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+
+
+huggingface_client = UpstreamClient(
+    "huggingface", HF_CONNECT_TIMEOUT_SECONDS, HF_READ_TIMEOUT_SECONDS, HF_MAX_RETRIES
+)
+# Posting is not idempotent: only retry when the request surely did not land.
+twitter_client = UpstreamClient(
+    "twitter", TWITTER_CONNECT_TIMEOUT_SECONDS, TWITTER_READ_TIMEOUT_SECONDS, TWITTER_MAX_RETRIES,
+    retry_statuses=(429, 503), retry_read_errors=False
+)
+
+
+async def close_clients():
+    for client in (huggingface_client, twitter_client):
+        await client.aclose()
@@ -0,0 +1,71 @@
+import asyncio
+import hashlib
+import json
+import threading
+import traceback
+from datetime import datetime, timedelta
+
+from fastapi import HTTPException
+from sqlalchemy import delete
+from sqlmodel import Session
+
+from src.config import IDEMPOTENCY_TTL_SECONDS
+from src.db import engine
+from src.schemas.schema import IdempotencyRecord
+
+PRUNE_EVERY = 100
+
+
+class IdempotencyStore:
+    """Stored responses for requests sent with an Idempotency-Key header.
+
+    A retry with the same key and the same request gets the stored response
+    back. Reusing a key for a different request is rejected. Only successful
+    responses are stored, so failed requests can be retried.
+    """
+
+    def __init__(self, ttl: int = IDEMPOTENCY_TTL_SECONDS):
+        self.ttl = ttl
+        self._writes = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def request_hash(scope: str, payload: dict) -> str:
+        raw = json.dumps({"scope": scope, "payload": payload}, sort_keys=True, default=str)
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def lookup(self, key: str, scope: str, payload: dict) -> IdempotencyRecord | None:
+        with Session(engine) as db:
+            record = db.get(IdempotencyRecord, key)
+        if record is None or (datetime.utcnow() - record.created_at).total_seconds() > self.ttl:
+            return None
+        if record.scope != scope or record.request_hash != self.request_hash(scope, payload):
+            raise HTTPException(status_code=422, detail="Idempotency-Key was already used for a different request")
+        return record
+
+    def save(self, key: str, scope: str, payload: dict, status_code: int, response: bytes):
+        with self._lock:
+            self._writes += 1
+            prune = self._writes % PRUNE_EVERY == 0
+        try:
+            with Session(engine) as db:
+                db.merge(IdempotencyRecord(key=key, scope=scope, request_hash=self.request_hash(scope, payload),
+                                           status_code=status_code, response=response.decode(),
+                                           created_at=datetime.utcnow()))
+                db.commit()
+                if prune:
+                    cutoff = datetime.utcnow() - timedelta(seconds=self.ttl)
+                    db.execute(delete(IdempotencyRecord).where(IdempotencyRecord.created_at < cutoff))
+                    db.commit()
+        except Exception:
+            # a concurrent retry stored it first; either copy is the same result
+            traceback.print_exc()
+
+    async def alookup(self, key: str, scope: str, payload: dict) -> IdempotencyRecord | None:
+        return await asyncio.to_thread(self.lookup, key, scope, payload)
+
+    async def asave(self, key: str, scope: str, payload: dict, status_code: int, response: bytes):
+        await asyncio.to_thread(self.save, key, scope, payload, status_code, response)
+
+
+idempotency_store = IdempotencyStore()
@@ -0,0 +1,86 @@
+import hashlib
+import os
+import threading
+from dataclasses import dataclass
+
+from cachetools import LRUCache
+
+from src.config import IMAGE_INDEX_SIZE
+
+CHUNK_SIZE = 1024 * 1024
+
+
+@dataclass(frozen=True)
+class ImageEntry:
+    path: str
+    etag: str
+    media_type: str
+    mtime: float
+    size: int
+
+
+def file_etag(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return f'"{digest.hexdigest()[:32]}"'
+
+
+def sniff_media_type(path: str) -> str:
+    with open(path, "rb") as f:
+        head = f.read(12)
+    if head.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if head.startswith(b"RIFF") and head[8:12] == b"WEBP":
+        return "image/webp"
+    return "image/png"
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return etag in candidates
+
+
+class ImageIndex:
+    """In-memory (tweet id, variant) -> image path / content hash map.
+
+    Lets a conditional GET be answered without touching the database, and
+    avoids re-hashing a file unless its size or mtime changed.
+    """
+
+    def __init__(self, maxsize: int = IMAGE_INDEX_SIZE):
+        self.entries = LRUCache(maxsize=max(1, maxsize))
+        self._lock = threading.Lock()
+
+    def lookup(self, key) -> ImageEntry | None:
+        with self._lock:
+            entry = self.entries.get(key)
+        # Regeneration removes the old file, so a missing file means a stale entry.
+        if entry is None or not os.path.exists(entry.path):
+            return None
+        return entry
+
+    def resolve(self, key, path: str) -> ImageEntry:
+        stat = os.stat(path)
+        with self._lock:
+            entry = self.entries.get(key)
+        if entry and entry.path == path and entry.mtime == stat.st_mtime and entry.size == stat.st_size:
+            return entry
+        entry = ImageEntry(path=path, etag=file_etag(path), media_type=sniff_media_type(path),
+                           mtime=stat.st_mtime, size=stat.st_size)
+        with self._lock:
+            self.entries[key] = entry
+        return entry
+
+    def invalidate(self, tweet_id: int):
+        with self._lock:
+            for key in [key for key in self.entries if key[0] == tweet_id]:
+                self.entries.pop(key, None)
+
+
+image_index = ImageIndex()
@@ -0,0 +1,133 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from src.config import IMAGE_WORKERS, IMAGE_WEBP_QUALITY, IMAGE_THUMB_SIZE
+
+UPLOAD_FOLDER = "upload"
+VARIANT_FIELDS = ("image_webp_path", "thumb_path", "thumb_webp_path")
+THUMB_SUFFIX = "_thumb"
+
+
+def is_upload_path(path: str | None) -> bool:
+    """True when `path` resolves to a file inside UPLOAD_FOLDER; image paths are never trusted otherwise."""
+    if not path:
+        return False
+    return Path(path).resolve().is_relative_to(Path(UPLOAD_FOLDER).resolve())
+
+
+def variant_paths(image_path: str) -> dict:
+    path = Path(image_path)
+    base = str(path.with_suffix(""))
+    return {
+        "image_webp_path": f"{base}.webp",
+        "thumb_path": f"{base}{THUMB_SUFFIX}{path.suffix}",
+        "thumb_webp_path": f"{base}{THUMB_SUFFIX}.webp",
+    }
+
+
+def image_variant_fields(image_path: str | None) -> dict:
+    """Variant columns for a Tweet row; variants that were not produced stay None."""
+    if not image_path:
+        return {field: None for field in VARIANT_FIELDS}
+    return {field: path if os.path.exists(path) else None for field, path in variant_paths(image_path).items()}
+
+
+def image_version(path: str) -> str:
+    """The original file stem shared by an image and all of its variants."""
+    return Path(path).stem.removesuffix(THUMB_SUFFIX)
+
+
+def remove_image_files(image_path: str | None):
+    if not is_upload_path(image_path):
+        return
+    for path in [image_path, *variant_paths(image_path).values()]:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def _save_optimized(img, path: str, source_format: str, quality: int):
+    # FLUX answers with JPEG bytes even though files are named .png; keep the source format.
+    if source_format == "JPEG":
+        img.convert("RGB").save(path, format="JPEG", quality=max(quality, 85), optimize=True, progressive=True)
+    else:
+        img.save(path, format="PNG", optimize=True)
+
+
+def _process_image(image_path: str, quality: int, thumb_size: int) -> dict:
+    # Runs in a worker process; keep it free of app state.
+    from PIL import Image
+
+    paths = variant_paths(image_path)
+    with Image.open(image_path) as img:
+        source_format = img.format
+        img.load()
+        if img.mode not in ("RGB", "RGBA", "L"):
+            img = img.convert("RGBA" if "A" in img.getbands() else "RGB")
+
+        tmp_path = f"{image_path}.tmp"
+        _save_optimized(img, tmp_path, source_format, quality)
+        if os.path.getsize(tmp_path) < os.path.getsize(image_path):
+            os.replace(tmp_path, image_path)
+        else:
+            os.remove(tmp_path)
+        img.save(paths["image_webp_path"], format="WEBP", quality=quality, method=4)
+
+        thumb = img.copy()
+        thumb.thumbnail((thumb_size, thumb_size))
+        _save_optimized(thumb, paths["thumb_path"], source_format, quality)
+        thumb.save(paths["thumb_webp_path"], format="WEBP", quality=quality, method=4)
+    return paths
+
+
+class ImageProcessor:
+    """Produces an optimized full image, a WebP copy and thumbnails in a process pool.
+
+    Failures are logged and leave the original file untouched; image serving
+    falls back to it when a variant is missing.
+    """
+
+    def __init__(self, workers: int = IMAGE_WORKERS, quality: int = IMAGE_WEBP_QUALITY,
+                 thumb_size: int = IMAGE_THUMB_SIZE):
+        self.workers = max(1, workers)
+        self.quality = quality
+        self.thumb_size = thumb_size
+        self._pool: ProcessPoolExecutor | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                # the API process runs threads, and forking one can copy a lock some other thread holds
+                self._pool = ProcessPoolExecutor(max_workers=self.workers,
+                                                 mp_context=multiprocessing.get_context("forkserver"))
+            return self._pool
+
+    def process(self, image_path: str) -> dict:
+        try:
+            return self.pool.submit(_process_image, image_path, self.quality, self.thumb_size).result()
+        except Exception:
+            traceback.print_exc()
+            return {}
+
+    async def aprocess(self, image_path: str) -> dict:
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self.pool, _process_image, image_path, self.quality, self.thumb_size)
+        except Exception:
+            traceback.print_exc()
+            return {}
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+
+image_processor = ImageProcessor()
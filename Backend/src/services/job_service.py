@@ -0,0 +1,178 @@
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from fastapi import HTTPException
+from sqlalchemy import update
+from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.config import JOB_WORKERS, JOB_MAX_PENDING, JOB_LLM_CONCURRENCY, JOB_IMAGE_CONCURRENCY, JOB_STALE_SECONDS
+from src.db import engine
+from src.schemas.schema import GenerationJob
+from src.services.ai_service import generate_tweet, should_generate_image, generate_image, generate_structured
+
+
+class JobService:
+    """Runs tweet generation in a bounded worker pool backed by the generationjob table.
+
+    The LLM and image stages take separate semaphores so a slow FLUX backlog
+    cannot starve text generation (and vice versa).
+    """
+
+    def __init__(self, tweet_service, workers: int = JOB_WORKERS, max_pending: int = JOB_MAX_PENDING,
+                 llm_concurrency: int = JOB_LLM_CONCURRENCY, image_concurrency: int = JOB_IMAGE_CONCURRENCY):
+        self.tweet_service = tweet_service
+        self.workers = max(1, workers)
+        self.max_pending = max(1, max_pending)
+        self.llm_slots = threading.BoundedSemaphore(max(1, llm_concurrency))
+        self.image_slots = threading.BoundedSemaphore(max(1, image_concurrency))
+        self.executor: ThreadPoolExecutor | None = None
+        self._lock = threading.Lock()
+        self._pending = 0
+
+    def start(self):
+        if self.executor is not None:
+            return
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="tweet-job")
+
+        # Queued jobs are picked up again. Running jobs may belong to another live process,
+        # so only those that stopped making progress are requeued; _run's claim keeps a job
+        # from being run twice either way.
+        with Session(engine) as db:
+            now = datetime.utcnow()
+            requeued = db.execute(
+                update(GenerationJob)
+                .where(GenerationJob.status == "running",
+                       GenerationJob.updated_at < now - timedelta(seconds=JOB_STALE_SECONDS))
+                .values(status="queued", stage="queued", progress=0, updated_at=now)
+            ).rowcount
+            db.commit()
+            job_ids = db.exec(
+                select(GenerationJob.id)
+                .where(GenerationJob.status == "queued")
+                .order_by(GenerationJob.created_at)
+            ).all()
+        if requeued:
+            print(f"Requeued {requeued} stale generation jobs")
+        with self._lock:
+            self._pending += len(job_ids)
+        for job_id in job_ids:
+            self._dispatch(job_id)
+
+    def stop(self):
+        if self.executor is None:
+            return
+        # Queued jobs stay in the table and are picked up again on the next start.
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.executor = None
+
+    def _check_submit(self, topic: str):
+        if not topic:
+            raise HTTPException(status_code=400, detail="Topic cannot be empty")
+        if len(topic) > 100:
+            raise HTTPException(status_code=400, detail="Topic is too long, must be under 100 characters")
+        if self.executor is None:
+            raise HTTPException(status_code=503, detail="Generation workers are not running")
+        # The slot is reserved here, in the same critical section as the check, so
+        # concurrent submits cannot overshoot max_pending; _dispatch's callback frees it.
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise HTTPException(status_code=429, detail="Too many generation jobs pending, try again later")
+            self._pending += 1
+
+    async def asubmit(self, topic: str, db: AsyncSession, bypass_cache: bool = False) -> GenerationJob:
+        self._check_submit(topic)
+        try:
+            job = GenerationJob(topic=topic, bypass_cache=bypass_cache)
+            db.add(job)
+            await db.commit()
+            await db.refresh(job)
+        except Exception as e:
+            self._release(None)
+            traceback.print_exc()
+            raise HTTPException(status_code=500, detail=f"An error occurred while creating the job: {str(e)}")
+        self._dispatch(job.id)
+        return job
+
+    def submit(self, topic: str, db: Session, bypass_cache: bool = False) -> GenerationJob:
+        self._check_submit(topic)
+        try:
+            job = GenerationJob(topic=topic, bypass_cache=bypass_cache)
+            db.add(job)
+            db.commit()
+            db.refresh(job)
+        except Exception as e:
+            self._release(None)
+            traceback.print_exc()
+            raise HTTPException(status_code=500, detail=f"An error occurred while creating the job: {str(e)}")
+        self._dispatch(job.id)
+        return job
+
+    def get_job(self, job_id: str, db: Session) -> GenerationJob:
+        if not db:
+            raise HTTPException(status_code=400, detail="Database session is required")
+        job = db.get(GenerationJob, job_id)
+        if not job:
+            raise HTTPException(status_code=404, detail="Job not found")
+        return job
+
+    def _dispatch(self, job_id: str):
+        # the caller has already counted the job in _pending
+        future = self.executor.submit(self._run, job_id)
+        future.add_done_callback(self._release)
+
+    def _release(self, _future):
+        with self._lock:
+            self._pending -= 1
+
+    def _update(self, db: Session, job: GenerationJob, **fields):
+        for key, value in fields.items():
+            setattr(job, key, value)
+        job.updated_at = datetime.utcnow()
+        db.add(job)
+        db.commit()
+
+    def _run(self, job_id: str):
+        with Session(engine, expire_on_commit=False) as db:
+            # Claim the job; another process may have picked it up first.
+            claimed = db.execute(
+                update(GenerationJob)
+                .where(GenerationJob.id == job_id, GenerationJob.status == "queued")
+                .values(status="running", stage="generating_text", progress=10, updated_at=datetime.utcnow())
+            ).rowcount == 1
+            db.commit()
+            if not claimed:
+                return
+
+            job = db.get(GenerationJob, job_id)
+            try:
+                with self.llm_slots:
+                    generated = generate_structured(job.topic, job.bypass_cache)
+
+                if generated is not None:
+                    content, needs_image, image_prompt = generated.tweet, generated.needs_image, generated.image_prompt
+                else:
+                    with self.llm_slots:
+                        content = generate_tweet(job.topic, job.bypass_cache)
+
+                    self._update(db, job, stage="deciding_image", progress=40)
+                    with self.llm_slots:
+                        needs_image = should_generate_image(job.topic)
+                    image_prompt = None
+
+                image_path = None
+                if needs_image:
+                    self._update(db, job, stage="generating_image", progress=60)
+                    with self.image_slots:
+                        image_path = generate_image(job.topic, image_prompt)
+
+                self._update(db, job, stage="saving", progress=90)
+                tweet = self.tweet_service._store_tweet(db, job.topic, content, image_path)
+                self._update(db, job, status="succeeded", stage="done", progress=100, tweet_id=tweet.id)
+            except Exception as e:
+                traceback.print_exc()
+                db.rollback()
+                detail = e.detail if isinstance(e, HTTPException) else str(e)
+                self._update(db, job, status="failed", stage="failed", error=str(detail))
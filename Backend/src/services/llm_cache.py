@@ -0,0 +1,153 @@
+import asyncio
+import hashlib
+import threading
+import time
+import traceback
+from datetime import datetime, timedelta
+
+from cachetools import LRUCache
+from sqlalchemy import delete, func
+from sqlmodel import Session, select
+
+from src.config import (LLM_CACHE_ENABLED, LLM_CACHE_MEMORY_SIZE, LLM_CACHE_DB_MAX_ENTRIES,
+                        LLM_CACHE_TWEET_TTL_SECONDS, LLM_CACHE_DECISION_TTL_SECONDS)
+from src.db import engine
+from src.schemas.schema import LLMCacheEntry
+
+PRUNE_EVERY = 100
+
+
+def normalize_topic(topic: str) -> str:
+    return " ".join(topic.lower().split())
+
+
+class LLMCache:
+    """Two-tier cache for LLM outputs: an in-process LRU in front of the llmcacheentry table.
+
+    Entries are keyed on (model, prompt template, normalized topic) and expire
+    after a per-kind TTL. Database errors are logged and treated as misses so
+    the cache can never fail a generation.
+    """
+
+    def __init__(self, enabled: bool = LLM_CACHE_ENABLED, memory_size: int = LLM_CACHE_MEMORY_SIZE,
+                 max_entries: int = LLM_CACHE_DB_MAX_ENTRIES, ttls: dict[str, int] | None = None):
+        self.enabled = enabled
+        self.max_entries = max_entries
+        self.ttls = ttls or {
+            "tweet": LLM_CACHE_TWEET_TTL_SECONDS,
+            "decision": LLM_CACHE_DECISION_TTL_SECONDS,
+            # tweet text plus image decision from one structured call
+            "combined": LLM_CACHE_TWEET_TTL_SECONDS,
+        }
+        self.memory = LRUCache(maxsize=max(1, memory_size))
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.counters = {kind: {"memory_hits": 0, "db_hits": 0, "misses": 0} for kind in self.ttls}
+
+    @staticmethod
+    def make_key(topic: str, template: str, model: str) -> str:
+        raw = f"{model}\x00{template}\x00{normalize_topic(topic)}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _count(self, kind: str, counter: str):
+        with self._lock:
+            self.counters.setdefault(kind, {"memory_hits": 0, "db_hits": 0, "misses": 0})[counter] += 1
+
+    def _memory_get(self, key: str, kind: str) -> str | None:
+        with self._lock:
+            item = self.memory.get(key)
+            if item is None:
+                return None
+            value, created_at = item
+            if time.time() - created_at > self.ttls.get(kind, 0):
+                self.memory.pop(key, None)
+                return None
+        self._count(kind, "memory_hits")
+        return value
+
+    def _db_get(self, key: str, kind: str) -> str | None:
+        try:
+            with Session(engine) as db:
+                entry = db.get(LLMCacheEntry, key)
+                if entry is None:
+                    return None
+                age = (datetime.utcnow() - entry.created_at).total_seconds()
+                if age > self.ttls.get(kind, 0):
+                    return None
+                value = entry.value
+        except Exception:
+            traceback.print_exc()
+            return None
+        with self._lock:
+            self.memory[key] = (value, time.time() - age)
+        self._count(kind, "db_hits")
+        return value
+
+    def get(self, key: str, kind: str) -> str | None:
+        if not self.enabled:
+            return None
+        value = self._memory_get(key, kind)
+        if value is None:
+            value = self._db_get(key, kind)
+        if value is None:
+            self._count(kind, "misses")
+        return value
+
+    def set(self, key: str, kind: str, value: str):
+        if not self.enabled:
+            return
+        with self._lock:
+            self.memory[key] = (value, time.time())
+            self._writes += 1
+            prune = self._writes % PRUNE_EVERY == 0
+        try:
+            with Session(engine) as db:
+                db.merge(LLMCacheEntry(key=key, kind=kind, value=value, created_at=datetime.utcnow()))
+                db.commit()
+                if prune:
+                    self._prune(db)
+        except Exception:
+            traceback.print_exc()
+
+    async def aget(self, key: str, kind: str) -> str | None:
+        if not self.enabled:
+            return None
+        value = self._memory_get(key, kind)
+        if value is not None:
+            return value
+        value = await asyncio.to_thread(self._db_get, key, kind)
+        if value is None:
+            self._count(kind, "misses")
+        return value
+
+    async def aset(self, key: str, kind: str, value: str):
+        if self.enabled:
+            await asyncio.to_thread(self.set, key, kind, value)
+
+    def _prune(self, db: Session):
+        # Drop expired rows, then the oldest rows beyond the size limit.
+        cutoff = datetime.utcnow() - timedelta(seconds=max(self.ttls.values()))
+        db.execute(delete(LLMCacheEntry).where(LLMCacheEntry.created_at < cutoff))
+        total = db.exec(select(func.count()).select_from(LLMCacheEntry)).one()
+        if total > self.max_entries:
+            boundary = db.exec(
+                select(LLMCacheEntry.created_at)
+                .order_by(LLMCacheEntry.created_at.desc())
+                .offset(self.max_entries)
+                .limit(1)
+            ).first()
+            if boundary is not None:
+                db.execute(delete(LLMCacheEntry).where(LLMCacheEntry.created_at <= boundary))
+        db.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            counters = {kind: dict(values) for kind, values in self.counters.items()}
+            size = len(self.memory)
+        for values in counters.values():
+            lookups = values["memory_hits"] + values["db_hits"] + values["misses"]
+            values["hit_ratio"] = round((lookups - values["misses"]) / lookups, 4) if lookups else 0.0
+        return {"enabled": self.enabled, "memory_entries": size, "kinds": counters}
+
+
+llm_cache = LLMCache()
@@ -0,0 +1,58 @@
+import asyncio
+import hashlib
+import json
+import random
+import time
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+
+class StubChatModel(BaseChatModel):
+    """Offline stand-in for Gemini with configurable latency and error rate.
+
+    Selected with LLM_PROVIDER=stub. Answers the image-decision prompt with a
+    deterministic YES for roughly `image_ratio` of topics, the combined prompt
+    with the same decision as a JSON object, and any other prompt with a
+    short tweet.
+    """
+
+    latency_ms: float = 0.0
+    error_rate: float = 0.0
+    image_ratio: float = 0.5
+
+    @property
+    def _llm_type(self) -> str:
+        return "stub"
+
+    def _reply(self, messages) -> str:
+        if random.random() < self.error_rate:
+            raise RuntimeError("Stub LLM injected failure")
+        prompt = str(messages[-1].content) if messages else ""
+        bucket = int(hashlib.md5(prompt.encode()).hexdigest(), 16) % 1000
+        needs_image = bucket < self.image_ratio * 1000
+        if "YES or NO" in prompt:
+            return "YES" if needs_image else "NO"
+        if "JSON object" in prompt:
+            return json.dumps({
+                "tweet": f"Stub tweet for benchmarking: {prompt[:120]} #benchmark",
+                "needs_image": needs_image,
+                "image_prompt": f"Stub image prompt: {prompt[:80]}" if needs_image else None,
+            })
+        return f"Stub tweet for benchmarking: {prompt[-120:]} #benchmark"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        time.sleep(self.latency_ms / 1000)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self._reply(messages)))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        await asyncio.sleep(self.latency_ms / 1000)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self._reply(messages)))])
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        # spread the latency over word-sized chunks, like a streaming model
+        words = self._reply(messages).split(" ")
+        for index, word in enumerate(words):
+            await asyncio.sleep(self.latency_ms / 1000 / len(words))
+            yield ChatGenerationChunk(message=AIMessageChunk(content=word if index == 0 else " " + word))
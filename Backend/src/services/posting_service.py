@@ -0,0 +1,233 @@
+import random
+import threading
+import time
+import traceback
+from datetime import datetime, timedelta, timezone
+
+from fastapi import HTTPException
+from sqlalchemy import update
+from sqlmodel import Session, select
+
+from src.config import (POST_RATE_PER_MINUTE, POST_BURST, POST_POLL_SECONDS, POST_DISPATCH_BATCH,
+                        POST_MAX_ATTEMPTS, POST_RETRY_BASE_SECONDS, POST_RETRY_MAX_SECONDS)
+from src.db import engine
+from src.schemas.schema import OutboxItem, Tweet
+from src.services.twitter_service import DeliveryUnknownError
+
+# "unknown": the post may have gone out unconfirmed; it is never retried automatically
+OUTBOX_STATUSES = ("pending", "sending", "sent", "failed", "cancelled", "unknown")
+
+
+class TokenBucket:
+    def __init__(self, rate_per_second: float, capacity: int):
+        self.rate = rate_per_second
+        self.capacity = max(1, capacity)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def try_acquire(self) -> float:
+        """Take a token; returns 0 on success, otherwise the seconds until one is available."""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) / self.rate
+
+
+class PostingScheduler:
+    """Background dispatcher for the outbox table.
+
+    Due items are claimed with a conditional UPDATE (pending -> sending), sent
+    through TweetService.deliver under a token-bucket rate limit, and either
+    marked sent or put back with exponential backoff until POST_MAX_ATTEMPTS.
+    Only sends that surely did not reach Twitter are retried; the rest end
+    as "unknown".
+    """
+
+    def __init__(self, tweet_service, rate_per_minute: float = POST_RATE_PER_MINUTE, burst: int = POST_BURST,
+                 poll_seconds: float = POST_POLL_SECONDS, batch_size: int = POST_DISPATCH_BATCH,
+                 max_attempts: int = POST_MAX_ATTEMPTS):
+        self.tweet_service = tweet_service
+        self.bucket = TokenBucket(max(rate_per_minute, 0.01) / 60, burst)
+        self.poll_seconds = poll_seconds
+        self.batch_size = batch_size
+        self.max_attempts = max(1, max_attempts)
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._recover()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="posting-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._wake.set()
+        self._thread.join(timeout=10)
+        self._thread = None
+
+    def schedule(self, tweet_id: int, scheduled_at: datetime | None, db: Session) -> OutboxItem:
+        if not db:
+            raise HTTPException(status_code=400, detail="Database session is required")
+        if tweet_id <= 0:
+            raise HTTPException(status_code=400, detail="Tweet ID must be a positive integer")
+        due_at = self._as_utc(scheduled_at) if scheduled_at else datetime.utcnow()
+
+        tweet = db.get(Tweet, tweet_id)
+        if not tweet:
+            raise HTTPException(status_code=404, detail="Tweet not found")
+        if tweet.posted:
+            raise HTTPException(status_code=400, detail="Tweet already posted")
+
+        item = db.exec(select(OutboxItem).where(OutboxItem.tweet_id == tweet_id)).first()
+        if item and item.status == "sending":
+            raise HTTPException(status_code=409, detail="Tweet is being posted right now")
+        if item is None:
+            item = OutboxItem(tweet_id=tweet_id)
+        item.status = "pending"
+        item.due_at = due_at
+        item.attempts = 0
+        item.last_error = None
+        item.updated_at = datetime.utcnow()
+        tweet.scheduled_at = due_at
+        db.add(item)
+        db.add(tweet)
+        db.commit()
+        db.refresh(item)
+        self.tweet_service._tweets_changed("unposted")
+        self._wake.set()
+        return item
+
+    def cancel(self, tweet_id: int, db: Session) -> OutboxItem:
+        if not db:
+            raise HTTPException(status_code=400, detail="Database session is required")
+        cancelled = db.execute(
+            update(OutboxItem)
+            .where(OutboxItem.tweet_id == tweet_id, OutboxItem.status == "pending")
+            .values(status="cancelled", updated_at=datetime.utcnow())
+        ).rowcount
+        if cancelled:
+            db.execute(update(Tweet).where(Tweet.id == tweet_id).values(scheduled_at=None))
+        db.commit()
+        if cancelled:
+            self.tweet_service._tweets_changed("unposted")
+        item = db.exec(select(OutboxItem).where(OutboxItem.tweet_id == tweet_id)).first()
+        if not item:
+            raise HTTPException(status_code=404, detail="Tweet is not scheduled")
+        if not cancelled:
+            raise HTTPException(status_code=409, detail=f"Scheduled post is already {item.status}")
+        return item
+
+    def list_outbox(self, db: Session, status: str | None = None, limit: int = 50) -> list[OutboxItem]:
+        if not db:
+            raise HTTPException(status_code=400, detail="Database session is required")
+        if status is not None and status not in OUTBOX_STATUSES:
+            raise HTTPException(status_code=400, detail=f"Status must be one of {', '.join(OUTBOX_STATUSES)}")
+        query = select(OutboxItem)
+        if status is not None:
+            query = query.where(OutboxItem.status == status)
+        return db.exec(query.order_by(OutboxItem.due_at).limit(limit)).all()
+
+    @staticmethod
+    def _as_utc(value: datetime) -> datetime:
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value
+
+    def _recover(self):
+        # Items left in 'sending' by a crash. A claimed tweet may or may not have gone out, and
+        # nothing confirmed it, so it is recorded as unknown; an unclaimed one is retried.
+        with Session(engine) as db:
+            stuck = db.exec(select(OutboxItem).where(OutboxItem.status == "sending")).all()
+            for item in stuck:
+                tweet = db.get(Tweet, item.tweet_id)
+                if tweet and tweet.posted:
+                    item.status = "unknown"
+                    item.last_error = "Interrupted while sending, delivery was not confirmed"
+                else:
+                    item.status = "pending"
+                item.updated_at = datetime.utcnow()
+                db.add(item)
+            db.commit()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                dispatched = self._dispatch_due()
+            except Exception:
+                traceback.print_exc()
+                dispatched = 0
+            if not dispatched:
+                self._wake.wait(self.poll_seconds)
+                self._wake.clear()
+
+    def _wait_for_token(self) -> bool:
+        while not self._stop.is_set():
+            wait = self.bucket.try_acquire()
+            if wait == 0:
+                return True
+            self._stop.wait(wait)
+        return False
+
+    def _dispatch_due(self) -> int:
+        with Session(engine) as db:
+            due_ids = db.exec(
+                select(OutboxItem.id)
+                .where(OutboxItem.status == "pending", OutboxItem.due_at <= datetime.utcnow())
+                .order_by(OutboxItem.due_at)
+                .limit(self.batch_size)
+            ).all()
+            dispatched = 0
+            for item_id in due_ids:
+                if not self._wait_for_token():
+                    break
+                if self._dispatch(db, item_id):
+                    dispatched += 1
+            return dispatched
+
+    def _dispatch(self, db: Session, item_id: int) -> bool:
+        # Claim the item; another worker or a cancel may have got there first.
+        claimed = db.execute(
+            update(OutboxItem)
+            .where(OutboxItem.id == item_id, OutboxItem.status == "pending")
+            .values(status="sending", attempts=OutboxItem.attempts + 1, updated_at=datetime.utcnow())
+        ).rowcount == 1
+        db.commit()
+        if not claimed:
+            return False
+
+        item = db.get(OutboxItem, item_id)
+        tweet = db.get(Tweet, item.tweet_id)
+        try:
+            if tweet is None:
+                raise HTTPException(status_code=404, detail="Tweet not found")
+            posted = self.tweet_service.deliver(db, tweet)
+            item.status = "sent"
+            item.last_error = None if posted else "already posted"
+        except Exception as e:
+            db.rollback()
+            error = e.detail if isinstance(e, HTTPException) else str(e)
+            item.last_error = str(error)[:500]
+            if isinstance(e, DeliveryUnknownError):
+                item.status = "unknown"
+            elif item.attempts >= self.max_attempts or (isinstance(e, HTTPException) and e.status_code == 404):
+                item.status = "failed"
+            else:
+                delay = min(POST_RETRY_MAX_SECONDS, POST_RETRY_BASE_SECONDS * 2 ** (item.attempts - 1))
+                item.status = "pending"
+                item.due_at = datetime.utcnow() + timedelta(seconds=random.uniform(delay / 2, delay))
+            print(f"Scheduled post {item.id} for tweet {item.tweet_id} failed ({item.attempts}): {error}")
+        item.updated_at = datetime.utcnow()
+        db.add(item)
+        db.commit()
+        return True
@@ -0,0 +1,208 @@
+import asyncio
+import hashlib
+import json
+import secrets
+import threading
+import traceback
+
+from cachetools import TTLCache
+
+from src.config import (RESPONSE_CACHE_ENABLED, RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TTL_SECONDS,
+                        RESPONSE_CACHE_URL)
+
+# Listing queries read either bucket or both; a write bumps the bucket(s) it touched.
+BUCKETS = ("posted", "unposted")
+
+
+def buckets_for(posted: bool | None) -> tuple[str, ...]:
+    if posted is None:
+        return BUCKETS
+    return ("posted",) if posted else ("unposted",)
+
+
+class MemoryBackend:
+    """Per-process LRU with TTL. Versions live in this process only, so use it with a single worker."""
+
+    def __init__(self, maxsize: int, ttl: int):
+        self.entries = TTLCache(maxsize=max(1, maxsize), ttl=ttl)
+        # Random starting versions: keys double as ETags, and a client may still hold one
+        # from an earlier process whose counters happened to reach the same numbers.
+        start = secrets.randbits(64)
+        self.version_numbers = {bucket: start for bucket in BUCKETS}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> bytes | None:
+        with self._lock:
+            return self.entries.get(key)
+
+    def set(self, key: str, value: bytes):
+        with self._lock:
+            self.entries[key] = value
+
+    def versions(self, buckets: tuple[str, ...]) -> list[int]:
+        with self._lock:
+            return [self.version_numbers[bucket] for bucket in buckets]
+
+    def bump(self, buckets: tuple[str, ...]):
+        with self._lock:
+            for bucket in buckets:
+                self.version_numbers[bucket] += 1
+
+    def size(self) -> int:
+        with self._lock:
+            return len(self.entries)
+
+
+class RedisBackend:
+    """Shared backend for multi-worker deployments; versions are Redis counters every worker reads."""
+
+    def __init__(self, url: str, ttl: int, prefix: str = "tweets:list:"):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("RESPONSE_CACHE_URL is set but the 'redis' package is not installed")
+        self.client = redis.Redis.from_url(url)
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get(self, key: str) -> bytes | None:
+        return self.client.get(self.prefix + key)
+
+    def set(self, key: str, value: bytes):
+        self.client.set(self.prefix + key, value, ex=self.ttl)
+
+    def _version_key(self, bucket: str) -> str:
+        return f"{self.prefix}version:{bucket}"
+
+    @staticmethod
+    def _seed() -> int:
+        # Like MemoryBackend, counters start at a random value, so after a flush or a restart
+        # without persistence they don't replay numbers an old ETag was built from.
+        # 62 bits leaves INCR plenty of room below Redis's signed 64-bit limit.
+        return secrets.randbits(62)
+
+    def versions(self, buckets: tuple[str, ...]) -> list[int]:
+        keys = [self._version_key(bucket) for bucket in buckets]
+        values = self.client.mget(keys)
+        if None in values:
+            # NX: when workers race to seed a counter, the first value wins and everyone reads it
+            pipeline = self.client.pipeline()
+            for key, value in zip(keys, values):
+                if value is None:
+                    pipeline.set(key, self._seed(), nx=True)
+            pipeline.execute()
+            values = self.client.mget(keys)
+        return [int(value) for value in values]
+
+    def bump(self, buckets: tuple[str, ...]):
+        pipeline = self.client.pipeline()
+        for bucket in buckets:
+            key = self._version_key(bucket)
+            pipeline.set(key, self._seed(), nx=True)
+            pipeline.incr(key)
+        pipeline.execute()
+
+    def size(self) -> int | None:
+        return None
+
+
+class ResponseCache:
+    """Serialized GET /tweet/tweets pages keyed by query parameters and bucket versions.
+
+    Writes never delete entries, they bump the version of the bucket they
+    touched, so later lookups build a new key and old pages age out. The key
+    doubles as the ETag: an unchanged page keeps its ETag until a write
+    lands in a bucket it depends on.
+    """
+
+    def __init__(self, backend, enabled: bool = RESPONSE_CACHE_ENABLED):
+        self.backend = backend
+        self.enabled = enabled
+        # network backends are called from a worker thread by the async helpers
+        self.blocking = not isinstance(backend, MemoryBackend)
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def key(self, params: dict) -> str | None:
+        """Cache key for a listing; None when caching is off or the versions can't be read."""
+        if not self.enabled:
+            return None
+        # Versions are read before the page query, so a page stored under them is never older than they are.
+        buckets = buckets_for(params.get("posted"))
+        try:
+            versions = dict(zip(buckets, self.backend.versions(buckets)))
+        except Exception:
+            self.errors += 1
+            traceback.print_exc()
+            return None
+        raw = json.dumps({"params": params, "versions": versions}, sort_keys=True, default=str)
+        return hashlib.sha256(raw.encode()).hexdigest()[:32]
+
+    @staticmethod
+    def etag(key: str) -> str:
+        return f'"{key}"'
+
+    def get(self, key: str) -> bytes | None:
+        if not self.enabled:
+            return None
+        try:
+            value = self.backend.get(key)
+        except Exception:
+            self.errors += 1
+            traceback.print_exc()
+            return None
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def set(self, key: str, value: bytes):
+        if not self.enabled:
+            return
+        try:
+            self.backend.set(key, value)
+        except Exception:
+            self.errors += 1
+            traceback.print_exc()
+
+    async def _run(self, method, *args):
+        if self.blocking:
+            return await asyncio.to_thread(method, *args)
+        return method(*args)
+
+    async def akey(self, params: dict) -> str | None:
+        return await self._run(self.key, params)
+
+    async def aget(self, key: str) -> bytes | None:
+        return await self._run(self.get, key)
+
+    async def aset(self, key: str, value: bytes):
+        await self._run(self.set, key, value)
+
+    def invalidate(self, buckets: tuple[str, ...] = BUCKETS):
+        try:
+            self.backend.bump(buckets)
+        except Exception:
+            self.errors += 1
+            traceback.print_exc()
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "backend": type(self.backend).__name__,
+            "entries": self.backend.size(),
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+        }
+
+
+def create_backend():
+    if RESPONSE_CACHE_URL:
+        return RedisBackend(RESPONSE_CACHE_URL, RESPONSE_CACHE_TTL_SECONDS)
+    return MemoryBackend(RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TTL_SECONDS)
+
+
+response_cache = ResponseCache(create_backend())
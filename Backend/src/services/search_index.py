@@ -0,0 +1,95 @@
+import re
+import traceback
+
+from sqlalchemy import text, func, or_, table, column, literal_column
+from sqlalchemy.engine import Engine
+
+from src.schemas.schema import Tweet
+
+MAX_TERMS = 10
+
+PG_DOCUMENT = "to_tsvector('english', coalesce(tweet.topic, '') || ' ' || coalesce(tweet.content, ''))"
+
+SQLITE_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS tweet_fts USING fts5(
+        topic, content, content='tweet', content_rowid='id', tokenize='unicode61'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS tweet_fts_ai AFTER INSERT ON tweet BEGIN
+        INSERT INTO tweet_fts(rowid, topic, content) VALUES (new.id, new.topic, new.content);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS tweet_fts_ad AFTER DELETE ON tweet BEGIN
+        INSERT INTO tweet_fts(tweet_fts, rowid, topic, content) VALUES ('delete', old.id, old.topic, old.content);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS tweet_fts_au AFTER UPDATE OF topic, content ON tweet BEGIN
+        INSERT INTO tweet_fts(tweet_fts, rowid, topic, content) VALUES ('delete', old.id, old.topic, old.content);
+        INSERT INTO tweet_fts(rowid, topic, content) VALUES (new.id, new.topic, new.content);
+    END""",
+]
+
+tweet_fts = table("tweet_fts", column("rowid"), column("rank"))
+
+
+def search_terms(search: str) -> list[str]:
+    return re.findall(r"\w+", search, re.UNICODE)[:MAX_TERMS]
+
+
+class SearchIndex:
+    """Full-text search over tweet topic and content.
+
+    Postgres gets a GIN index on a tsvector expression, SQLite an external-content
+    FTS5 table kept in sync by triggers. Any other backend (or a SQLite build
+    without FTS5) falls back to the ILIKE scan.
+    """
+
+    def __init__(self):
+        self.mode = "like"
+
+    def setup(self, engine: Engine):
+        dialect = engine.dialect.name
+        try:
+            if dialect == "postgresql":
+                with engine.begin() as conn:
+                    conn.execute(text(f"CREATE INDEX IF NOT EXISTS ix_tweet_search ON tweet USING GIN ({PG_DOCUMENT})"))
+                self.mode = "postgres"
+            elif dialect == "sqlite":
+                with engine.begin() as conn:
+                    exists = conn.execute(
+                        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'tweet_fts'")
+                    ).first()
+                    for statement in SQLITE_DDL:
+                        conn.execute(text(statement))
+                    if not exists:
+                        # Index rows that were written before the FTS table existed.
+                        conn.execute(text("INSERT INTO tweet_fts(tweet_fts) VALUES ('rebuild')"))
+                self.mode = "fts5"
+            print(f"Search index mode: {self.mode}")
+        except Exception:
+            traceback.print_exc()
+            print("Full-text search index unavailable, falling back to ILIKE search")
+            self.mode = "like"
+
+    def apply(self, query, count_query, search: str, ranked: bool = True):
+        """Filter both queries by `search`; returns (query, count_query, order_by)."""
+        terms = search_terms(search)
+        if self.mode == "postgres" and terms:
+            ts_query = func.to_tsquery(literal_column("'english'"), " & ".join(f"{term}:*" for term in terms))
+            document = literal_column(PG_DOCUMENT)
+            match = document.op("@@")(ts_query)
+            order_by = [func.ts_rank(document, ts_query).desc()] if ranked else []
+            return query.where(match), count_query.where(match), order_by
+
+        if self.mode == "fts5" and terms:
+            match = literal_column("tweet_fts").op("MATCH")(" ".join(f'"{term}"*' for term in terms))
+            query = query.join(tweet_fts, tweet_fts.c.rowid == Tweet.id).where(match)
+            count_query = count_query.join(tweet_fts, tweet_fts.c.rowid == Tweet.id).where(match)
+            order_by = [tweet_fts.c.rank] if ranked else []
+            return query, count_query, order_by
+
+        search_filter = or_(
+            Tweet.topic.ilike(f"%{search}%"),
+            Tweet.content.ilike(f"%{search}%")
+        )
+        return query.where(search_filter), count_query.where(search_filter), []
+
+
+search_index = SearchIndex()
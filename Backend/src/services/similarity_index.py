@@ -0,0 +1,151 @@
+import hashlib
+import operator
+import re
+import struct
+import threading
+import traceback
+
+from sqlalchemy import select, update
+from sqlalchemy.engine import Engine
+from sqlmodel import Session
+
+from src.config import DUPLICATE_MIN_SIMILARITY
+from src.schemas.schema import Tweet
+
+SIGNATURE_SIZE = 64
+BANDS = 16
+ROWS = SIGNATURE_SIZE // BANDS
+BACKFILL_CHUNK_SIZE = 1000
+
+# Words too common to say anything about a tweet; dropping them keeps
+# rephrasings of one tweet close together.
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or our so that the this to was we were "
+    "will with you your".split()
+)
+
+# one 64-byte blake2b digest gives 32 independent 16-bit hash values
+_HASH_VALUES = struct.Struct("<32H")
+
+
+def _features(text: str) -> set[str]:
+    # first six letters only, so "collection"/"collector" or "treatment"/"treatments" still match
+    return {word[:6] for word in re.findall(r"\w+", text.lower(), re.UNICODE) if word not in STOPWORDS}
+
+
+def minhash(text: str) -> bytes:
+    """MinHash signature of `text`: SIGNATURE_SIZE minimums, each kept to its low byte (b-bit MinHash)."""
+    rows = []
+    for feature in _features(text or "") or {""}:
+        data = feature.encode()
+        rows.append(_HASH_VALUES.unpack(hashlib.blake2b(data, digest_size=64).digest())
+                    + _HASH_VALUES.unpack(hashlib.blake2b(data, digest_size=64, person=b"minhash").digest()))
+    return bytes(value & 0xFF for value in map(min, zip(*rows)))
+
+
+def similarity(first: bytes, second: bytes) -> float:
+    """Estimated Jaccard similarity of the word sets behind two signatures."""
+    agreeing = sum(map(operator.eq, first, second)) / SIGNATURE_SIZE
+    # one byte in 256 agrees by chance
+    return max(0.0, (agreeing - 1 / 256) / (1 - 1 / 256))
+
+
+class SimilarityIndex:
+    """Near-duplicate lookup over tweet MinHash signatures, held in memory.
+
+    Signatures are cut into BANDS bands of ROWS bytes and every band value
+    points at the tweets that have it. Tweets sharing any band are
+    candidates, and their signatures decide. With 16 bands of 4 a pair with
+    similarity 0.6 becomes a candidate about 9 times in 10, one at 0.7
+    almost always, while unrelated tweets rarely do, so a lookup touches a
+    handful of rows however large the table is. Costs about 1-2 KB per tweet.
+    """
+
+    def __init__(self):
+        self.signatures: dict[int, bytes] = {}
+        self.buckets: list[dict[bytes, set[int]]] = [{} for _ in range(BANDS)]
+        self.loaded = False
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _bands(signature: bytes) -> list[bytes]:
+        return [signature[band * ROWS:(band + 1) * ROWS] for band in range(BANDS)]
+
+    def _discard(self, tweet_id: int):
+        signature = self.signatures.pop(tweet_id, None)
+        if signature is None:
+            return
+        for band, value in enumerate(self._bands(signature)):
+            bucket = self.buckets[band].get(value)
+            if bucket is not None:
+                bucket.discard(tweet_id)
+                if not bucket:
+                    del self.buckets[band][value]
+
+    def add(self, tweet_id: int, signature: bytes | None):
+        if not signature:
+            return
+        with self._lock:
+            self._discard(tweet_id)
+            self.signatures[tweet_id] = signature
+            for band, value in enumerate(self._bands(signature)):
+                self.buckets[band].setdefault(value, set()).add(tweet_id)
+
+    def remove(self, tweet_id: int):
+        with self._lock:
+            self._discard(tweet_id)
+
+    def similar(self, signature: bytes, min_similarity: float = DUPLICATE_MIN_SIMILARITY, limit: int = 10,
+                exclude: int | None = None) -> list[dict]:
+        """Most similar tweets at or above `min_similarity`, closest first."""
+        matches = []
+        with self._lock:
+            candidates = set()
+            for band, value in enumerate(self._bands(signature)):
+                bucket = self.buckets[band].get(value)
+                if bucket:
+                    candidates.update(bucket)
+            candidates.discard(exclude)
+            for tweet_id in candidates:
+                score = similarity(signature, self.signatures[tweet_id])
+                if score >= min_similarity:
+                    matches.append((-score, tweet_id))
+        matches.sort()
+        return [{"id": tweet_id, "similarity": round(-score, 3)} for score, tweet_id in matches[:limit]]
+
+    def load(self, engine: Engine):
+        """Fill in signatures missing from the table, then index every row."""
+        try:
+            backfilled = 0
+            with Session(engine) as db:
+                while True:
+                    rows = db.exec(
+                        select(Tweet.id, Tweet.content).where(Tweet.minhash.is_(None))
+                        .order_by(Tweet.id).limit(BACKFILL_CHUNK_SIZE)
+                    ).all()
+                    if not rows:
+                        break
+                    db.execute(update(Tweet), [{"id": tweet_id, "minhash": minhash(content)}
+                                               for tweet_id, content in rows])
+                    db.commit()
+                    backfilled += len(rows)
+
+                result = db.exec(select(Tweet.id, Tweet.minhash).execution_options(yield_per=BACKFILL_CHUNK_SIZE))
+                for tweet_id, signature in result:
+                    self.add(tweet_id, signature)
+            self.loaded = True
+            print(f"Similarity index loaded: {len(self.signatures)} tweets ({backfilled} signatures backfilled)")
+        except Exception:
+            traceback.print_exc()
+            print("Similarity index unavailable, near-duplicate checks will only see new tweets")
+
+    def start(self, engine: Engine):
+        # backfilling a large table takes a while; serve requests meanwhile
+        threading.Thread(target=self.load, args=(engine,), name="similarity-index", daemon=True).start()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"loaded": self.loaded, "tweets": len(self.signatures)}
+
+
+similarity_index = SimilarityIndex()
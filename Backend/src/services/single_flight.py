@@ -0,0 +1,71 @@
+import asyncio
+import threading
+
+from src.metrics import Counter
+
+COALESCED = Counter("singleflight_coalesced_total", "Calls that joined an identical call already in flight.", ("flight",))
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key into one execution.
+
+    `do` is for threads: the first caller runs the function, later callers
+    block until it finishes and get the same result or exception. `ado` does
+    the same on the event loop; the work runs in its own task, so one caller
+    disconnecting does not cancel it for the others. Nothing is cached once
+    the call completes.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls = {}
+        self._tasks = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn, *args, **kwargs):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if not leader:
+            COALESCED.inc(flight=self.name)
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    async def ado(self, key, fn, *args, **kwargs):
+        task = self._tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn(*args, **kwargs))
+            self._tasks[key] = task
+            task.add_done_callback(lambda finished: self._finish(key, finished))
+        else:
+            COALESCED.inc(flight=self.name)
+        return await asyncio.shield(task)
+
+    def _finish(self, key, task: asyncio.Future):
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+        # mark the exception retrieved even if every caller went away
+        if not task.cancelled():
+            task.exception()
@@ -0,0 +1,176 @@
+import csv
+import io
+import json
+import traceback
+from datetime import datetime
+from tempfile import SpooledTemporaryFile
+
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+from pydantic import ValidationError
+from sqlalchemy import func, insert, select
+from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.config import EXPORT_CHUNK_SIZE, IMPORT_CHUNK_SIZE, IMPORT_SPOOL_MAX_BYTES
+from src.db import engine, get_async_engine
+from src.models.models import TweetImport, TweetOut
+from src.schemas.schema import Tweet
+from src.services.image_service import image_variant_fields, is_upload_path
+from src.services.search_index import search_index
+from src.services.similarity_index import similarity_index, minhash
+
+EXPORT_FIELDS = list(TweetOut.model_fields)
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+# per-row errors listed in the import summary; the rest are only counted
+MAX_REPORTED_ERRORS = 20
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+class TweetTransferService:
+    """Bulk export and import of tweets as NDJSON or CSV.
+
+    Exports read through a streaming cursor in EXPORT_CHUNK_SIZE partitions
+    and encode one partition at a time, so memory stays flat however many
+    rows match. Imports spool the upload, then validate and insert it in
+    IMPORT_CHUNK_SIZE chunks; rows that fail validation are skipped and
+    reported, ids are always assigned by the database.
+    """
+
+    def __init__(self, tweet_service):
+        self.tweet_service = tweet_service
+
+    # --- Export ---
+    def export_query(self, posted: bool | None = None, search: str | None = None):
+        if search is not None and len(search) > 100:
+            raise HTTPException(status_code=400, detail="Search query is too long, must be under 100 characters")
+        columns = Tweet.__table__.c
+        query = select(*(columns[name] for name in EXPORT_FIELDS))
+        if posted is not None:
+            query = query.where(Tweet.posted == posted)
+        if search is not None:
+            query, _, _ = search_index.apply(query, select(func.count()).select_from(Tweet), search, ranked=False)
+        return query.order_by(Tweet.id).execution_options(yield_per=EXPORT_CHUNK_SIZE)
+
+    async def export_stream(self, query, format: str):
+        """Yield the encoded export; runs after the response starts, so it opens its own session."""
+        encode = self._encode_csv if format == "csv" else self._encode_ndjson
+        if format == "csv":
+            yield self._encode_csv([EXPORT_FIELDS])
+        try:
+            async with AsyncSession(get_async_engine()) as db:
+                result = await db.stream(query)
+                async for rows in result.partitions():
+                    yield encode(rows)
+        except Exception:
+            # headers are already sent; closing the stream early is the only signal left
+            traceback.print_exc()
+            raise
+
+    @staticmethod
+    def _encode_ndjson(rows) -> bytes:
+        return "".join(
+            json.dumps(dict(zip(EXPORT_FIELDS, row)), default=_json_default) + "\n" for row in rows
+        ).encode()
+
+    @staticmethod
+    def _encode_csv(rows) -> bytes:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerows(
+            [value.isoformat() if isinstance(value, datetime) else value for value in row] for row in rows
+        )
+        return buffer.getvalue().encode()
+
+    # --- Import ---
+    async def aimport_tweets(self, stream, format: str) -> dict:
+        with SpooledTemporaryFile(max_size=IMPORT_SPOOL_MAX_BYTES) as spool:
+            async for chunk in stream:
+                # same rule as Starlette's UploadFile: disk writes go to a thread
+                if getattr(spool, "_rolled", True):
+                    await run_in_threadpool(spool.write, chunk)
+                else:
+                    spool.write(chunk)
+            spool.seek(0)
+            return await run_in_threadpool(self.import_tweets, spool, format)
+
+    def _records(self, file, format: str):
+        """(line number, record) pairs; a line that is not a JSON object comes back as a ValueError."""
+        text = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+        if format == "csv":
+            reader = csv.DictReader(text)
+            for row in reader:
+                # empty CSV cells mean "not set"
+                yield reader.line_num, {key: value for key, value in row.items() if key and value != ""}
+            return
+        for line_number, line in enumerate(text, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                yield line_number, e
+                continue
+            yield line_number, record if isinstance(record, dict) else ValueError("expected a JSON object")
+
+    @staticmethod
+    def _describe(error: ValueError) -> str:
+        if isinstance(error, ValidationError):
+            return "; ".join(f"{'.'.join(map(str, item['loc'])) or 'record'}: {item['msg']}" for item in error.errors())
+        return str(error)
+
+    def _insert_chunk(self, db: Session, rows: list[dict]):
+        inserted = db.execute(insert(Tweet).returning(Tweet.id, Tweet.minhash), rows).all()
+        db.commit()
+        for tweet_id, signature in inserted:
+            similarity_index.add(tweet_id, signature)
+
+    def import_tweets(self, file, format: str) -> dict:
+        imported, skipped, errors = 0, 0, []
+        chunk = []
+        try:
+            with Session(engine) as db:
+                for line_number, record in self._records(file, format):
+                    try:
+                        if isinstance(record, ValueError):
+                            raise record
+                        item = TweetImport.model_validate(record)
+                        # the image routes serve and delete this path, so it must stay inside the upload folder
+                        if item.image_path is not None and not is_upload_path(item.image_path):
+                            raise ValueError("image_path: must point inside the upload folder")
+                    except ValueError as e:
+                        skipped += 1
+                        if len(errors) < MAX_REPORTED_ERRORS:
+                            errors.append({"line": line_number, "error": self._describe(e)})
+                        continue
+
+                    chunk.append({
+                        "topic": item.topic,
+                        "content": item.content,
+                        "posted": item.posted,
+                        "created_at": item.created_at or datetime.utcnow(),
+                        "image_path": item.image_path,
+                        "minhash": minhash(item.content),
+                        **image_variant_fields(item.image_path),
+                    })
+                    if len(chunk) >= IMPORT_CHUNK_SIZE:
+                        self._insert_chunk(db, chunk)
+                        imported += len(chunk)
+                        chunk = []
+                if chunk:
+                    self._insert_chunk(db, chunk)
+                    imported += len(chunk)
+        except (UnicodeDecodeError, csv.Error) as e:
+            raise HTTPException(status_code=400, detail=f"Could not parse upload after {imported} rows: {str(e)}")
+        except Exception as e:
+            traceback.print_exc()
+            raise HTTPException(status_code=500, detail=f"Import failed after {imported} rows: {str(e)}")
+        finally:
+            if imported:
+                self.tweet_service._tweets_changed()
+        return {"imported": imported, "skipped": skipped, "errors": errors}
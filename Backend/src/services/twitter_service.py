@@ -1,35 +1,325 @@
-import os
+import json
+import base64
+import asyncio
+import threading
 import traceback
 import requests
-from src.services.ai_service import agentic_tweet_workflow,generate_image
-from src.config import TWITTER_API_KEY, TWITTER_URL
+from cachetools import TTLCache
+from src.services.ai_service import (agentic_tweet_workflow, agentic_tweet_workflow_async, agentic_tweet_batch, generate_image,
+                                     astream_tweet, ashould_generate_image, agenerate_image, generate_tweet, agenerate_tweet)
+from src.config import (TWITTER_API_KEY, TWITTER_URL, BATCH_MAX_TOPICS, BATCH_MAX_CONCURRENCY, BATCH_IMAGE_CONCURRENCY, COUNT_CACHE_TTL_SECONDS,
+                        DUPLICATE_MIN_SIMILARITY, DUPLICATE_MAX_RETRIES)
 from src.schemas.schema import Tweet
+from src.db import get_async_engine
 from fastapi import HTTPException
 from sqlmodel import select, Session
-from sqlalchemy import func, or_
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy import func, text, update
+from src.services.search_index import search_index
+from src.services.http_client import twitter_client, CircuitOpenError
+from src.services.image_index import image_index
+from src.services.image_service import image_variant_fields, remove_image_files
+from src.metrics import stage
+from src.services.response_cache import response_cache, buckets_for, BUCKETS
+from src.services.single_flight import SingleFlight
+from src.services.llm_cache import normalize_topic
+from src.services.similarity_index import similarity_index, minhash
 from math import ceil
-from pathlib import Path
+
+
+ESTIMATE_QUERY = select(text("reltuples::bigint")).select_from(text("pg_class")).where(text("relname = 'tweet'"))
+
+def encode_cursor(tweet_id: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps({"id": tweet_id}).encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        tweet_id = json.loads(base64.urlsafe_b64decode(padded.encode()))["id"]
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(tweet_id, int) or tweet_id <= 0:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return tweet_id
+
+class DeliveryUnknownError(Exception):
+    """The post may have reached Twitter but no reply confirmed it; the tweet stays marked as posted."""
 
 
 class TweetService:
 
-    def generate_tweet_service(self, topic: str, db: Session):
+    def __init__(self):
+        self._count_cache = TTLCache(maxsize=256, ttl=COUNT_CACHE_TTL_SECONDS)
+        self._count_lock = threading.Lock()
+        # identical requests already in flight share one upstream round trip and one result
+        self._generation_flight = SingleFlight("generate_tweet")
+        self._image_flight = SingleFlight("regenerate_image")
+
+    def _tweets_changed(self, *buckets: str):
+        """Drop cached counts and listing pages; `buckets` narrows which listings went stale."""
+        with self._count_lock:
+            self._count_cache.clear()
+        response_cache.invalidate(buckets or BUCKETS)
+
+    def _cached_count(self, plan: dict) -> int | None:
+        with self._count_lock:
+            return self._count_cache.get((plan["posted"], plan["search"]))
+
+    def _remember_count(self, plan: dict, total: int):
+        with self._count_lock:
+            self._count_cache[(plan["posted"], plan["search"])] = total
+
+    def _can_estimate(self, db, plan: dict) -> bool:
+        return (plan["count"] == "estimated" and plan["posted"] is None and plan["search"] is None
+                and db.get_bind().dialect.name == "postgresql")
+
+    def _count(self, db: Session, plan: dict) -> int | None:
+        if plan["count"] == "none":
+            return None
+        if plan["count"] == "exact":
+            return db.exec(plan["count_query"]).one()
+        if self._can_estimate(db, plan):
+            estimate = db.exec(ESTIMATE_QUERY).first()
+            if estimate is not None and estimate >= 0:
+                return int(estimate)
+        total = self._cached_count(plan)
+        if total is None:
+            total = db.exec(plan["count_query"]).one()
+            self._remember_count(plan, total)
+        return total
+
+    async def _acount(self, db: AsyncSession, plan: dict) -> int | None:
+        if plan["count"] == "none":
+            return None
+        if plan["count"] == "exact":
+            return (await db.exec(plan["count_query"])).one()
+        if self._can_estimate(db, plan):
+            estimate = (await db.exec(ESTIMATE_QUERY)).first()
+            if estimate is not None and estimate >= 0:
+                return int(estimate)
+        total = self._cached_count(plan)
+        if total is None:
+            total = (await db.exec(plan["count_query"])).one()
+            self._remember_count(plan, total)
+        return total
+
+    def _new_tweet(self, topic: str, content: str, image_path: str | None) -> Tweet:
+        return Tweet(content=content, topic=topic, image_path=image_path, minhash=minhash(content),
+                     **image_variant_fields(image_path))
+
+    def _find_duplicates(self, content: str) -> list[dict]:
+        with stage("duplicate_check"):
+            return similarity_index.similar(minhash(content))
+
+    def _store_tweet(self, db: Session, topic: str, content: str, image_path: str | None) -> Tweet:
+        tweet_entry = self._new_tweet(topic, content, image_path)
+        with stage("db_commit"):
+            db.add(tweet_entry)
+            db.commit()
+            db.refresh(tweet_entry)
+        similarity_index.add(tweet_entry.id, tweet_entry.minhash)
+        self._tweets_changed("unposted")
+        return tweet_entry
+
+    async def _astore_tweet(self, db: AsyncSession, topic: str, content: str, image_path: str | None) -> Tweet:
+        tweet_entry = self._new_tweet(topic, content, image_path)
+        with stage("db_commit"):
+            db.add(tweet_entry)
+            await db.commit()
+            await db.refresh(tweet_entry)
+        similarity_index.add(tweet_entry.id, tweet_entry.minhash)
+        self._tweets_changed("unposted")
+        return tweet_entry
+
+    async def _astore_tweets(self, db: AsyncSession, items: list[dict]) -> list[int]:
+        entries = [self._new_tweet(item["topic"], item["tweet"], item["image"]) for item in items]
+        with stage("db_commit"):
+            db.add_all(entries)
+            await db.flush()
+            ids = [entry.id for entry in entries]
+            await db.commit()
+        for entry in entries:
+            similarity_index.add(entry.id, entry.minhash)
+        self._tweets_changed("unposted")
+        return ids
+
+    def _store_tweets(self, db: Session, items: list[dict]) -> list[int]:
+        entries = [self._new_tweet(item["topic"], item["tweet"], item["image"]) for item in items]
+        with stage("db_commit"):
+            db.add_all(entries)
+            db.flush()
+            ids = [entry.id for entry in entries]
+            db.commit()
+        for entry in entries:
+            similarity_index.add(entry.id, entry.minhash)
+        self._tweets_changed("unposted")
+        return ids
+
+    def generate_tweet_service(self, topic: str, db: Session, bypass_cache: bool = False,
+                               regenerate_duplicates: bool = False):
         if not topic:
             raise HTTPException(status_code=400, detail="Topic cannot be empty")
         if len(topic) > 100:
             raise HTTPException(status_code=400, detail="Topic is too long, must be under 100 characters")
         try:
+            return self._generation_flight.do((normalize_topic(topic), bypass_cache, regenerate_duplicates),
+                                              self._generate_and_store, topic, db, bypass_cache, regenerate_duplicates)
+        except Exception as e:
+            traceback.print_exc()
+            raise HTTPException(status_code=500, detail=f"An error occurred while generating the tweet: {str(e)}")
 
-            tweet = agentic_tweet_workflow(topic)
-            tweet_entry = Tweet(content=tweet['tweet'], topic=topic, image_path=tweet['image'] if 'image' in tweet else None)
-            db.add(tweet_entry)
-            db.commit()
-            db.refresh(tweet_entry)
-            return {"tweet": tweet, "id": tweet_entry.id}
+    def _generate_and_store(self, topic: str, db: Session, bypass_cache: bool, regenerate_duplicates: bool) -> dict:
+        tweet = agentic_tweet_workflow(topic, bypass_cache)
+        duplicates = self._find_duplicates(tweet['tweet'])
+        # Only the text is generated again; the image was made for the topic and still fits.
+        for _ in range(DUPLICATE_MAX_RETRIES if regenerate_duplicates else 0):
+            if not duplicates:
+                break
+            tweet['tweet'] = generate_tweet(topic, bypass_cache=True)
+            duplicates = self._find_duplicates(tweet['tweet'])
+        tweet_entry = self._store_tweet(db, topic, tweet['tweet'], tweet['image'] if 'image' in tweet else None)
+        return {"tweet": tweet, "id": tweet_entry.id, "duplicates": duplicates}
+
+    async def agenerate_tweet_service(self, topic: str, bypass_cache: bool = False,
+                                      regenerate_duplicates: bool = False):
+        if not topic:
+            raise HTTPException(status_code=400, detail="Topic cannot be empty")
+        if len(topic) > 100:
+            raise HTTPException(status_code=400, detail="Topic is too long, must be under 100 characters")
+        try:
+            return await self._generation_flight.ado((normalize_topic(topic), bypass_cache, regenerate_duplicates),
+                                                     self._agenerate_and_store, topic, bypass_cache,
+                                                     regenerate_duplicates)
         except Exception as e:
             traceback.print_exc()
             raise HTTPException(status_code=500, detail=f"An error occurred while generating the tweet: {str(e)}")
 
+    async def _agenerate_and_store(self, topic: str, bypass_cache: bool, regenerate_duplicates: bool) -> dict:
+        tweet = await agentic_tweet_workflow_async(topic, bypass_cache)
+        duplicates = self._find_duplicates(tweet['tweet'])
+        for _ in range(DUPLICATE_MAX_RETRIES if regenerate_duplicates else 0):
+            if not duplicates:
+                break
+            tweet['tweet'] = await agenerate_tweet(topic, bypass_cache=True)
+            duplicates = self._find_duplicates(tweet['tweet'])
+        # Own session: the shared call outlives any single request that joined it.
+        async with AsyncSession(get_async_engine(), expire_on_commit=False) as db:
+            tweet_entry = await self._astore_tweet(db, topic, tweet['tweet'], tweet['image'])
+        return {"tweet": tweet, "id": tweet_entry.id, "duplicates": duplicates}
+
+    def stream_tweet_service(self, topic: str, bypass_cache: bool = False):
+        if not topic:
+            raise HTTPException(status_code=400, detail="Topic cannot be empty")
+        if len(topic) > 100:
+            raise HTTPException(status_code=400, detail="Topic is too long, must be under 100 characters")
+        return self._tweet_events(topic, bypass_cache)
+
+    async def _tweet_events(self, topic: str, bypass_cache: bool):
+        """Yield (event, data) pairs: token chunks, then decision and image as they land, then done or error.
+
+        Text and the image branch run side by side like agentic_tweet_workflow_async;
+        the row is written once both finished, in its own session because the
+        request's session is closed by the time the response streams.
+        """
+        queue = asyncio.Queue()
+        results = {}
+
+        async def text():
+            chunks = []
+            async for chunk in astream_tweet(topic, bypass_cache):
+                chunks.append(chunk)
+                await queue.put(("token", {"text": chunk}))
+            return "".join(chunks).strip()
+
+        async def image():
+            needs_image = await ashould_generate_image(topic)
+            await queue.put(("decision", {"needs_image": needs_image}))
+            if not needs_image:
+                return None
+            image_path = await agenerate_image(topic)
+            await queue.put(("image", {"image_path": image_path}))
+            return image_path
+
+        async def run(name, branch):
+            try:
+                results[name] = await branch()
+                await queue.put(None)
+            except Exception as e:
+                await queue.put(e)
+
+        tasks = [asyncio.create_task(run("tweet", text)), asyncio.create_task(run("image", image))]
+        try:
+            finished = 0
+            while finished < len(tasks):
+                item = await queue.get()
+                if item is None:
+                    finished += 1
+                elif isinstance(item, Exception):
+                    raise item
+                else:
+                    yield item
+
+            async with AsyncSession(get_async_engine(), expire_on_commit=False) as db:
+                tweet_entry = await self._astore_tweet(db, topic, results["tweet"], results["image"])
+            tweet = {"topic": topic, "tweet": results["tweet"], "image": results["image"]}
+            yield "done", {"tweet": tweet, "id": tweet_entry.id}
+        except Exception as e:
+            traceback.print_exc()
+            detail = e.detail if isinstance(e, HTTPException) else str(e)
+            yield "error", {"detail": f"An error occurred while generating the tweet: {detail}"}
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def agenerate_batch_service(self, topics: list[str], db: AsyncSession, max_concurrency: int | None = None,
+                                      bypass_cache: bool = False):
+        if not topics:
+            raise HTTPException(status_code=400, detail="At least one topic is required")
+        if len(topics) > BATCH_MAX_TOPICS:
+            raise HTTPException(status_code=400, detail=f"Too many topics, at most {BATCH_MAX_TOPICS} per batch")
+
+        errors = []
+        valid = []
+        for index, topic in enumerate(topics):
+            if not topic:
+                errors.append({"index": index, "topic": topic, "error": "Topic cannot be empty"})
+            elif len(topic) > 100:
+                errors.append({"index": index, "topic": topic, "error": "Topic is too long, must be under 100 characters"})
+            else:
+                valid.append((index, topic))
+
+        results = []
+        if valid:
+            try:
+                generated = await agentic_tweet_batch(
+                    [topic for _, topic in valid],
+                    max_concurrency or BATCH_MAX_CONCURRENCY,
+                    BATCH_IMAGE_CONCURRENCY,
+                    bypass_cache
+                )
+                succeeded = []
+                for (index, _), item in zip(valid, generated):
+                    if item["error"]:
+                        errors.append({"index": index, "topic": item["topic"], "error": item["error"]})
+                    else:
+                        succeeded.append((index, item))
+
+                ids = await self._astore_tweets(db, [item for _, item in succeeded])
+                for (index, item), tweet_id in zip(succeeded, ids):
+                    results.append({"index": index, "id": tweet_id, "topic": item["topic"],
+                                     "tweet": item["tweet"], "image": item["image"]})
+            except Exception as e:
+                traceback.print_exc()
+                raise HTTPException(status_code=500, detail=f"An error occurred while generating the batch: {str(e)}")
+
+        errors.sort(key=lambda error: error["index"])
+        return {
+            "results": results,
+            "errors": errors,
+            "succeeded": len(results),
+            "failed": len(errors)
+        }
+
     def post_twitter(self, id: int, db: Session):
         if not TWITTER_API_KEY or not TWITTER_URL:
             raise HTTPException(status_code=500, detail="Twitter API credentials are not configured")
@@ -51,27 +341,66 @@ class TweetService:
             if tweet.posted:
                 return {"status": "already posted", "tweet": tweet.content}
 
-            headers = {
-                "api-key": TWITTER_API_KEY,
-                "Content-Type": "application/json"
-            }
-            body = {
-                "username": "soumojit",
-                "text": tweet.content
-            }
-
-            response = requests.post(TWITTER_URL, headers=headers, json=body)
-            if response.status_code == 200:
-                tweet.posted = True
-                db.commit()
-                return {"status": "posted", "tweet": tweet.content}
-            else:
-                raise HTTPException(status_code=response.status_code, detail=response.text)
+            content = tweet.content
+            if not self.deliver(db, tweet):
+                return {"status": "already posted", "tweet": content}
+            return {"status": "posted", "tweet": content}
+        except CircuitOpenError as e:
+            raise HTTPException(status_code=503, detail=str(e))
+        except DeliveryUnknownError as e:
+            raise HTTPException(status_code=504, detail=str(e))
         except requests.RequestException as e:
             raise HTTPException(status_code=500, detail=f"An error occurred while posting the tweet: {str(e)}")
 
-    def getAll(self, db: Session, posted: bool | None = None, search: str | None = None,
-               limit: int = 10, offset: int = 0):
+    def deliver(self, db: Session, tweet: Tweet) -> bool:
+        """Send `tweet` to the Twitter clone; returns False if another caller already posted it.
+
+        Raises DeliveryUnknownError when the request may have landed without a reply.
+        """
+        if not TWITTER_API_KEY or not TWITTER_URL:
+            raise HTTPException(status_code=500, detail="Twitter API credentials are not configured")
+        tweet_id, content = tweet.id, tweet.content
+
+        # posted is flipped before sending so racing callers cannot both post the row.
+        claimed = db.execute(
+            update(Tweet).where(Tweet.id == tweet_id, Tweet.posted == False).values(posted=True)
+        ).rowcount == 1
+        db.commit()
+        if not claimed:
+            return False
+
+        headers = {
+            "api-key": TWITTER_API_KEY,
+            "Content-Type": "application/json"
+        }
+        body = {
+            "username": "soumojit",
+            "text": content
+        }
+        try:
+            with stage("twitter_post"):
+                response = twitter_client.post(TWITTER_URL, headers=headers, json=body)
+        except Exception as e:
+            # Only a request that never left can be retried; after a read timeout or an aborted
+            # connection the post may be live, and posting again would duplicate it.
+            if isinstance(e, CircuitOpenError) or twitter_client._connect_failed(e):
+                self._release_claim(db, tweet_id)
+                raise
+            self._tweets_changed()
+            raise DeliveryUnknownError(f"Twitter did not confirm the post, it may have been published: {e}") from e
+        if response.status_code != 200:
+            self._release_claim(db, tweet_id)
+            raise HTTPException(status_code=response.status_code, detail=response.text)
+        self._tweets_changed()
+        return True
+
+    def _release_claim(self, db: Session, tweet_id: int):
+        db.execute(update(Tweet).where(Tweet.id == tweet_id).values(posted=False))
+        db.commit()
+        self._tweets_changed()
+
+    def _list_plan(self, db, posted: bool | None, search: str | None, limit: int, offset: int,
+                   cursor: str | None, pagination: str, count: str) -> dict:
         if not db:
             raise HTTPException(status_code=400, detail="Database session is required")
         if not db.is_active:
@@ -90,39 +419,92 @@ class TweetService:
             raise HTTPException(status_code=400, detail="Posted filter must be a boolean value")
         if not isinstance(limit, int) or not isinstance(offset, int):
             raise HTTPException(status_code=400, detail="Limit and offset must be integers")
-        try:
-            query = select(Tweet)
-            count_query = select(func.count()).select_from(Tweet)
+        if pagination not in ("offset", "cursor"):
+            raise HTTPException(status_code=400, detail="Pagination must be 'offset' or 'cursor'")
+        if count not in ("exact", "cached", "estimated", "none"):
+            raise HTTPException(status_code=400, detail="Count must be one of 'exact', 'cached', 'estimated' or 'none'")
+        if cursor is not None:
+            pagination = "cursor"
+        after_id = decode_cursor(cursor) if cursor else None
 
-            if posted is not None:
-                query = query.where(Tweet.posted == posted)
-                count_query = count_query.where(Tweet.posted == posted)
+        query = select(Tweet)
+        count_query = select(func.count()).select_from(Tweet)
 
-            if search is not None:
-                search_filter = or_(
-                    Tweet.topic.ilike(f"%{search}%"),
-                    Tweet.content.ilike(f"%{search}%")
-                )
-                query = query.where(search_filter)
-                count_query = count_query.where(search_filter)
+        if posted is not None:
+            query = query.where(Tweet.posted == posted)
+            count_query = count_query.where(Tweet.posted == posted)
+
+        order_by = []
+        if search is not None:
+            # Keyset pages must follow id order, so ranking only applies to offset pages.
+            query, count_query, order_by = search_index.apply(
+                query, count_query, search, ranked=pagination == "offset"
+            )
 
-            total_items = db.exec(count_query).first()
-            total_pages = ceil(total_items / limit) if limit > 0 else 1
-            current_page = (offset // limit) + 1 if limit > 0 else 1
+        if pagination == "cursor":
+            if after_id is not None:
+                query = query.where(Tweet.id < after_id)
+            page_query = query.order_by(Tweet.id.desc()).limit(limit + 1)
+        else:
+            page_query = query.order_by(*order_by, Tweet.id.desc()).offset(offset).limit(limit)
 
-            tweets = db.exec(query.order_by(Tweet.id.desc()).offset(offset).limit(limit)).all()
+        return {
+            "page_query": page_query,
+            "count_query": count_query,
+            "count": count,
+            "pagination": pagination,
+            "posted": posted,
+            "search": search,
+            "limit": limit,
+            "offset": offset,
+        }
 
+    def _list_result(self, plan: dict, tweets: list, total_items: int | None) -> dict:
+        limit = plan["limit"]
+        if plan["pagination"] == "cursor":
+            has_more = len(tweets) > limit
+            tweets = tweets[:limit]
             return {
                 "items": tweets,
+                "next_cursor": encode_cursor(tweets[-1].id) if has_more else None,
+                "has_more": has_more,
                 "total_items": total_items,
-                "total_pages": total_pages,
-                "current_page": current_page,
                 "limit": limit
             }
+
+        total_pages = ceil(total_items / limit) if total_items is not None else None
+        current_page = (plan["offset"] // limit) + 1 if limit > 0 else 1
+        return {
+            "items": tweets,
+            "total_items": total_items,
+            "total_pages": total_pages,
+            "current_page": current_page,
+            "limit": limit
+        }
+
+    def getAll(self, db: Session, posted: bool | None = None, search: str | None = None,
+               limit: int = 10, offset: int = 0, cursor: str | None = None,
+               pagination: str = "offset", count: str = "exact"):
+        plan = self._list_plan(db, posted, search, limit, offset, cursor, pagination, count)
+        try:
+            total_items = self._count(db, plan)
+            tweets = db.exec(plan["page_query"]).all()
+            return self._list_result(plan, tweets, total_items)
+        except Exception as e:
+            traceback.print_exc()
+            raise HTTPException(status_code=500, detail=f"An error occurred while fetching tweets: {str(e)}")
+
+    async def agetAll(self, db: AsyncSession, posted: bool | None = None, search: str | None = None,
+                      limit: int = 10, offset: int = 0, cursor: str | None = None,
+                      pagination: str = "offset", count: str = "exact"):
+        plan = self._list_plan(db, posted, search, limit, offset, cursor, pagination, count)
+        try:
+            total_items = await self._acount(db, plan)
+            tweets = (await db.exec(plan["page_query"])).all()
+            return self._list_result(plan, tweets, total_items)
         except Exception as e:
             traceback.print_exc()
             raise HTTPException(status_code=500, detail=f"An error occurred while fetching tweets: {str(e)}")
-        
 
     def update_tweet(self, id: int, topic: str, content: str, db: Session):
         if not db:
@@ -149,10 +531,13 @@ class TweetService:
                 tweet.topic = topic
             if content is not None:
                 tweet.content = content
+                tweet.minhash = minhash(content)
 
             db.add(tweet)
             db.commit()
             db.refresh(tweet)
+            similarity_index.add(tweet.id, tweet.minhash)
+            self._tweets_changed("unposted")
             return tweet
         except Exception as e:
             traceback.print_exc()
@@ -168,7 +553,10 @@ class TweetService:
             raise HTTPException(status_code=400, detail="Tweet ID must be an integer")
         if tweet_id <= 0:
             raise HTTPException(status_code=400, detail="Tweet ID must be a positive integer")
+        # Concurrent regenerations of one tweet would each call FLUX and delete each other's files.
+        return self._image_flight.do(tweet_id, self._regenerate_image, tweet_id, db)
 
+    def _regenerate_image(self, tweet_id: int, db: Session) -> dict:
         try:
             tweet = db.exec(select(Tweet).where(Tweet.id == tweet_id)).first()
             if not tweet:
@@ -176,22 +564,22 @@ class TweetService:
             if not tweet.image_path:
                 raise HTTPException(status_code=404, detail="No image generated for this tweet")
 
-            image_path = tweet.image_path
-            if not image_path:
-                image_path = generate_image(tweet.topic)
-            else:
-                if not Path(image_path).exists():
-                    image_path = generate_image(tweet.topic)
-                else:
-                    os.remove(image_path)  # Remove old image if it exists
-                    image_path = generate_image(tweet.topic)
+            old_image_path = tweet.image_path
+            image_path = generate_image(tweet.topic)
             if not image_path:
                 raise HTTPException(status_code=500, detail="Failed to generate image")
-                    
+
             tweet.image_path = image_path
+            for field, value in image_variant_fields(image_path).items():
+                setattr(tweet, field, value)
             db.add(tweet)
             db.commit()
             db.refresh(tweet)
+            image_index.invalidate(tweet_id)
+            self._tweets_changed(*buckets_for(tweet.posted))
+            # The old files go only once the replacement is stored.
+            if old_image_path != image_path:
+                remove_image_files(old_image_path)
             image_path = tweet.image_path
             return {
                 "image_path": image_path,
@@ -219,4 +607,43 @@ class TweetService:
             return tweet
         except Exception as e:
             traceback.print_exc()
-            raise HTTPException(status_code=500, detail=f"An error occurred while fetching the tweet: {str(e)}")
\ No newline at end of file
+            raise HTTPException(status_code=500, detail=f"An error occurred while fetching the tweet: {str(e)}")
+
+    async def aget_single_tweet(self, tweet_id: int, db: AsyncSession):
+        if not db:
+            raise HTTPException(status_code=400, detail="Database session is required")
+        if not db.is_active:
+            raise HTTPException(status_code=500, detail="Database session is not active")
+        if not tweet_id:
+            raise HTTPException(status_code=400, detail="Tweet ID is required")
+        if not isinstance(tweet_id, int):
+            raise HTTPException(status_code=400, detail="Tweet ID must be an integer")
+        if tweet_id <= 0:
+            raise HTTPException(status_code=400, detail="Tweet ID must be a positive integer")
+
+        try:
+            tweet = await db.get(Tweet, tweet_id)
+            if not tweet:
+                raise HTTPException(status_code=404, detail="Tweet not found")
+            return tweet
+        except HTTPException:
+            raise
+        except Exception as e:
+            traceback.print_exc()
+            raise HTTPException(status_code=500, detail=f"An error occurred while fetching the tweet: {str(e)}")
+
+    async def aget_similar_tweets(self, tweet_id: int, db: AsyncSession,
+                                  min_similarity: float = DUPLICATE_MIN_SIMILARITY, limit: int = 10) -> dict:
+        tweet = await self.aget_single_tweet(tweet_id, db)
+        signature = tweet.minhash or minhash(tweet.content)
+        matches = similarity_index.similar(signature, min_similarity, limit, exclude=tweet_id)
+        tweets = {}
+        if matches:
+            rows = (await db.exec(select(Tweet).where(Tweet.id.in_([match["id"] for match in matches])))).all()
+            tweets = {row.id: row for row in rows}
+        # the in-memory index can name a row that is gone from the table; skip those
+        return {
+            "tweet_id": tweet_id,
+            "min_similarity": min_similarity,
+            "items": [{**match, "tweet": tweets[match["id"]]} for match in matches if match["id"] in tweets],
+        }
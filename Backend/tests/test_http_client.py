@@ -0,0 +1,73 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+import requests
+
+from src.services.http_client import CircuitBreaker, CircuitOpenError, UpstreamClient
+
+RESET_SECONDS = 0.05
+
+
+def open_client() -> UpstreamClient:
+    """A client whose breaker has just tripped and is ready to let one probe through."""
+    client = UpstreamClient("test", 1, 1, 0)
+    client.breaker = CircuitBreaker("test", threshold=1, reset_timeout=RESET_SECONDS)
+    client.breaker.record_failure()
+    time.sleep(RESET_SECONDS)
+    assert client.breaker.state == "half_open"
+    return client
+
+
+def test_cancelled_async_probe_releases_breaker(monkeypatch):
+    client = open_client()
+
+    async def hang(*args, **kwargs):
+        await asyncio.sleep(10)
+
+    async def ok(*args, **kwargs):
+        return httpx.Response(200)
+
+    async def scenario():
+        monkeypatch.setattr(client.async_client, "post", hang)
+        probe = asyncio.create_task(client.apost("http://upstream"))
+        await asyncio.sleep(0.01)
+        probe.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await probe
+
+        # still half-open, and the next call is allowed to probe
+        assert client.breaker.state == "half_open"
+        monkeypatch.setattr(client.async_client, "post", ok)
+        response = await client.apost("http://upstream")
+        assert response.status_code == 200
+        await client.aclose()
+
+    asyncio.run(scenario())
+    assert client.breaker.state == "closed"
+
+
+def test_unexpected_error_in_sync_probe_counts_as_failure(monkeypatch):
+    client = open_client()
+
+    def broken(*args, **kwargs):
+        raise ValueError("bad request arguments")
+
+    monkeypatch.setattr(client.session, "post", broken)
+    with pytest.raises(ValueError):
+        client.post("http://upstream")
+
+    # the failed probe reopened the breaker; once the timeout passes it probes again
+    with pytest.raises(CircuitOpenError):
+        client.post("http://upstream")
+    time.sleep(RESET_SECONDS)
+    monkeypatch.setattr(client.session, "post", lambda *args, **kwargs: _response(200))
+    assert client.post("http://upstream").status_code == 200
+    assert client.breaker.state == "closed"
+
+
+def _response(status_code: int) -> requests.Response:
+    response = requests.Response()
+    response.status_code = status_code
+    return response
@@ -379,7 +379,7 @@ function App() {
                                                 <>
                                                     <p class="text-lg leading-relaxed text-gray-800 dark:text-white mb-4 font-medium">{tweet.content}</p>
                                                     {tweet.image_path&&(
-                                                        <img src={mockBackend.getImage(tweet.id)} 
+                                                        <img src={mockBackend.getImage(tweet.id, tweet.image_path, "thumb")} 
                                                     alt={tweet.topic} title={tweet.topic}  
                                                     class=" max-h-96 align-middle rounded-xl shadow-md mb-4 transition-transform duration-300 hover:scale-105"  />
                                                     )}
@@ -420,7 +420,7 @@ function App() {
                                                     placeholder="Edit topic..."
                                                 />
                                                 { tweet.image_path && (
-                                                    <img src={mockBackend.getImage(tweet.id)} alt="" class="w-full h-auto rounded-2xl" />
+                                                    <img src={mockBackend.getImage(tweet.id, tweet.image_path)} alt="" class="w-full h-auto rounded-2xl" />
                                                 )}
                                             </div>
                                         </Show>
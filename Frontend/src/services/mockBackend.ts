@@ -58,8 +58,12 @@ class MockBackendService {
     const res = await axios.post(`${BACKEND}/tweet/image-generate/${tweet_id}`);
     return res.data;
   }
-  getImage(tweet_id: number): string {
-    return `${BACKEND}/tweet/image/${tweet_id}`;
+  getImage(tweet_id: number, image_path?: string | null, size: "full" | "thumb" = "full"): string {
+    const params = new URLSearchParams({ size, format: "webp" });
+    // Pinning the URL to the image file lets the browser cache it indefinitely.
+    const version = image_path?.split("/").pop()?.replace(/\.[^.]+$/, "");
+    if (version) params.set("v", version);
+    return `${BACKEND}/tweet/image/${tweet_id}?${params}`;
   }
   async deleteImage(tweet_id: number): Promise<void> {
     await axios.delete(`${BACKEND}/tweet/image/${tweet_id}`);